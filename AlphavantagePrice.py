@@ -41,16 +41,1152 @@ r"""
 }
 """
 
+import concurrent.futures
 import datetime
 import json
-import matplotlib.pyplot as plt
-import requests
+import os
+import re
+import sys
+import tempfile
+import threading
+import numpy as np
+
+from alphavantage_indicators import IndicatorEngine
+from alphavantage_metrics import metrics
+from alphavantage_mmap import write_bar_file, open_bar_file
+
+BASE_URL = 'https://www.alphavantage.co/query'
+
+# keys of the per-bar fields in the "Time Series (Nmin)" section, in column order
+OPEN_KEY = '1. open'
+HIGH_KEY = '2. high'
+LOW_KEY = '3. low'
+CLOSE_KEY = '4. close'
+VOLUME_KEY = '5. volume'
+BAR_KEYS = (OPEN_KEY, HIGH_KEY, LOW_KEY, CLOSE_KEY, VOLUME_KEY)
+
+# prices are held as int64 ticks of 1 / PRICE_SCALE, the 4 decimals of the service
+PRICE_DECIMALS = 4
+PRICE_SCALE = 10 ** PRICE_DECIMALS
 
 
 class NoDataException(Exception):
     pass
 
 
+class ThrottleException(NoDataException):
+    """The service answered with a "Note" or "Information" message instead of data (rate limit reached)."""
+    pass
+
+
+def to_ticks(prices):
+    """Convert prices to int64 ticks (price * PRICE_SCALE, rounded to the nearest tick).
+
+    Args:
+        prices (array_like): Prices as numbers or decimal strings.
+
+    Returns:
+        numpy.ndarray: The ticks as int64.
+    """
+
+    return np.rint(np.asarray(prices).astype(np.float64) * PRICE_SCALE).astype(np.int64)
+
+
+def format_ticks(ticks):
+    """Format a tick count as the service formats prices, e.g. 1477800 as "147.7800"."""
+
+    ticks = int(ticks)
+    sign = '-' if ticks < 0 else ''
+    units, fraction = divmod(abs(ticks), PRICE_SCALE)
+    return f'{sign}{units}.{fraction:0{PRICE_DECIMALS}d}'
+
+
+def to_datetime64(value):
+    """Convert a timestamp string ("2023-11-03 15:00:00"), date or datetime to numpy.datetime64 in seconds."""
+
+    if isinstance(value, str):
+        value = value.strip()
+    return np.datetime64(value, 's')
+
+
+class BarStore():
+    """Columnar storage of intraday bars, built once from the "Time Series (Nmin)" section.
+
+    Bars are kept in ascending time order as parallel NumPy arrays: 'timestamps' (datetime64[s]),
+    'open_ticks', 'high_ticks', 'low_ticks', 'close_ticks' (int64 ticks, price * PRICE_SCALE) and 'volume' (int64).
+    The price strings of the response are decoded in bulk at load time, so sums and averages over ticks are exact
+    and reproducible. 'open', 'high', 'low' and 'close' are float64 views computed on first access.
+    """
+
+    def __init__(self, timestamps, open_prices, high_prices, low_prices, close_prices, volumes):
+        """Initialize a BarStore from already sorted columns of prices.
+
+        Args:
+            timestamps (numpy.ndarray): Ascending bar timestamps as datetime64[s].
+            open_prices (numpy.ndarray): Opening prices, converted to ticks.
+            high_prices (numpy.ndarray): Highest prices, converted to ticks.
+            low_prices (numpy.ndarray): Lowest prices, converted to ticks.
+            close_prices (numpy.ndarray): Closing prices, converted to ticks.
+            volumes (numpy.ndarray): Volumes as int64.
+        """
+
+        self._init(timestamps, to_ticks(open_prices), to_ticks(high_prices), to_ticks(low_prices),
+                   to_ticks(close_prices), volumes)
+
+    def _init(self, timestamps, open_ticks, high_ticks, low_ticks, close_ticks, volumes):
+        self.timestamps = timestamps
+        self.open_ticks = open_ticks
+        self.high_ticks = high_ticks
+        self.low_ticks = low_ticks
+        self.close_ticks = close_ticks
+        self.volume = volumes
+        self._prices = {}
+        self._daily = None
+
+    @classmethod
+    def from_ticks(cls, timestamps, open_ticks, high_ticks, low_ticks, close_ticks, volumes):
+        """Initialize a BarStore from already sorted columns of int64 ticks, without conversion or copy."""
+
+        bars = cls.__new__(cls)
+        bars._init(timestamps, open_ticks, high_ticks, low_ticks, close_ticks, volumes)
+        return bars
+
+    def _price_view(self, name):
+        prices = self._prices.get(name)
+        if prices is None:
+            prices = getattr(self, name + '_ticks') / PRICE_SCALE
+            self._prices[name] = prices
+        return prices
+
+    @property
+    def open(self):
+        """numpy.ndarray: Opening prices as float64, computed from the ticks on first access."""
+
+        return self._price_view('open')
+
+    @property
+    def high(self):
+        """numpy.ndarray: Highest prices as float64, computed from the ticks on first access."""
+
+        return self._price_view('high')
+
+    @property
+    def low(self):
+        """numpy.ndarray: Lowest prices as float64, computed from the ticks on first access."""
+
+        return self._price_view('low')
+
+    @property
+    def close(self):
+        """numpy.ndarray: Closing prices as float64, computed from the ticks on first access."""
+
+        return self._price_view('close')
+
+    @classmethod
+    def empty(cls):
+        """Create a BarStore holding no bars."""
+
+        ticks = np.empty(0, dtype=np.int64)
+        return cls.from_ticks(np.empty(0, dtype='datetime64[s]'), ticks, ticks.copy(), ticks.copy(), ticks.copy(),
+                              np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_time_series(cls, time_series):
+        """Build a BarStore from the "Time Series (Nmin)" dict of a response.
+
+        Args:
+            time_series (dict): Mapping of timestamp strings to dicts of price/volume strings.
+
+        Returns:
+            BarStore: The bars sorted by ascending timestamp.
+        """
+
+        if not time_series:
+            return cls.empty()
+
+        with metrics.timer('build_bars'):
+            return cls._from_time_series(time_series)
+
+    @classmethod
+    def _from_time_series(cls, time_series):
+        metrics.increment('bars_parsed', len(time_series))
+        timestamps = np.array([key.strip() for key in time_series.keys()], dtype='datetime64[s]')
+        bars = list(time_series.values())
+        columns = [to_ticks([bar[key] for bar in bars]) for key in BAR_KEYS[:4]]
+        volumes = np.array([bar[VOLUME_KEY] for bar in bars], dtype=np.int64)
+
+        # the service returns the newest bar first
+        order = np.argsort(timestamps, kind='stable')
+        return cls.from_ticks(timestamps[order], *[column[order] for column in columns], volumes[order])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def select(self, mask):
+        """Get a new BarStore holding the bars where 'mask' is True.
+
+        Args:
+            mask (numpy.ndarray): Boolean array with one entry per bar.
+
+        Returns:
+            BarStore: The selected bars.
+        """
+
+        return BarStore.from_ticks(self.timestamps[mask], self.open_ticks[mask], self.high_ticks[mask],
+                                   self.low_ticks[mask], self.close_ticks[mask], self.volume[mask])
+
+    def session_mask(self, start, end):
+        """Mark the bars starting at or after 'start' and before 'end' on their day.
+
+        Args:
+            start (datetime.time): Start of the session.
+            end (datetime.time): End of the session.
+
+        Returns:
+            numpy.ndarray: Boolean array with one entry per bar.
+        """
+
+        seconds = (self.timestamps - self.timestamps.astype('datetime64[D]')).astype(np.int64)
+        return (seconds >= _seconds_of_day(start)) & (seconds < _seconds_of_day(end))
+
+    def index_of(self, timestamp):
+        """Find the position of the bar at 'timestamp' by binary search.
+
+        Args:
+            timestamp (str, datetime.datetime or numpy.datetime64): The timestamp to look up.
+
+        Returns:
+            int or None: Position of the bar, or None if there is no bar at that timestamp.
+        """
+
+        value = to_datetime64(timestamp)
+        index = int(np.searchsorted(self.timestamps, value, side='left'))
+        if index < len(self.timestamps) and self.timestamps[index] == value:
+            return index
+        return None
+
+    def between(self, start, end):
+        """Get the bars with a timestamp in [start, end] as a BarStore of views (no copy).
+
+        Args:
+            start (str, datetime.datetime or numpy.datetime64): First timestamp included, or None for the first bar.
+            end (str, datetime.datetime or numpy.datetime64): Last timestamp included, or None for the last bar.
+
+        Returns:
+            BarStore: The bars within the range.
+        """
+
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, to_datetime64(start), side='left'))
+        stop = len(self) if end is None else int(np.searchsorted(self.timestamps, to_datetime64(end), side='right'))
+        return self[first:max(first, stop)]
+
+    def on(self, date):
+        """Get the bars of one day as a BarStore of views (no copy).
+
+        Args:
+            date (str, datetime.date or numpy.datetime64): The day, e.g. "2023-11-03".
+
+        Returns:
+            BarStore: The bars of that day.
+        """
+
+        day = np.datetime64(to_datetime64(date), 'D')
+        first = int(np.searchsorted(self.timestamps, day, side='left'))
+        stop = int(np.searchsorted(self.timestamps, day + np.timedelta64(1, 'D'), side='left'))
+        return self[first:stop]
+
+    def __getitem__(self, index):
+        """Slice the bars, e.g. bars[-10:], giving a BarStore of views."""
+
+        if not isinstance(index, slice):
+            raise TypeError("BarStore supports slices only, use bar(index) for a single bar")
+        return BarStore.from_ticks(self.timestamps[index], self.open_ticks[index], self.high_ticks[index],
+                                   self.low_ticks[index], self.close_ticks[index], self.volume[index])
+
+    def resample(self, minutes, align='session'):
+        """Aggregate the bars into bars of a coarser interval.
+
+        Each bar goes to the bucket starting at or before its timestamp: open of the first bar, highest high,
+        lowest low, close of the last bar and total volume. Buckets without any bar are left out, and the last
+        bucket may still be forming.
+
+        Args:
+            minutes (int): The new interval in minutes, a multiple of the interval of these bars.
+            align (str, optional): 'session' restarts the buckets at the pre-market (04:00), regular (09:30) and
+                post-market (16:00) session starts, so no bar mixes two sessions (e.g. 60min bars from 09:30);
+                'clock' aligns them on the clock from midnight. Default is 'session'.
+
+        Returns:
+            BarStore: The resampled bars, labelled with the start of their bucket.
+        """
+
+        if align not in ('session', 'clock'):
+            raise ValueError(f"Unsupported alignment: {align}")
+        if not len(self):
+            return self
+
+        days = self.timestamps.astype('datetime64[D]')
+        seconds = (self.timestamps - days).astype(np.int64)
+        if align == 'session':
+            boundaries = np.array([0] + [_seconds_of_day(time) for time in (
+                EXTENDED_SESSION_START, REGULAR_SESSION_START, REGULAR_SESSION_END, EXTENDED_SESSION_END)])
+            origin = boundaries[np.searchsorted(boundaries, seconds, side='right') - 1]
+        else:
+            origin = 0
+        width = minutes * 60
+        labels = days + (origin + (seconds - origin) // width * width).astype('timedelta64[s]')
+
+        starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+        ends = np.concatenate((starts[1:], [len(labels)])) - 1
+        return BarStore.from_ticks(labels[starts], self.open_ticks[starts],
+                                   np.maximum.reduceat(self.high_ticks, starts),
+                                   np.minimum.reduceat(self.low_ticks, starts), self.close_ticks[ends],
+                                   np.add.reduceat(self.volume, starts))
+
+    def daily(self):
+        """Aggregate the bars into one row per day in a single pass; computed once and cached.
+
+        Returns:
+            DailyBars: The daily OHLCV table of these bars.
+        """
+
+        if self._daily is None:
+            self._daily = DailyBars.from_bars(self)
+        return self._daily
+
+    def merge(self, other):
+        """Merge bars into a new BarStore; bars of 'other' replace bars with the same timestamp.
+
+        Args:
+            other (BarStore): The bars to merge in, e.g. an update downloaded later.
+
+        Returns:
+            BarStore: The merged bars in ascending time order.
+        """
+
+        if not len(other):
+            return self
+        timestamps = np.concatenate((self.timestamps, other.timestamps))
+        # stable sort keeps our bar before the bar of 'other' with the same timestamp, then keep the latter
+        order = np.argsort(timestamps, kind='stable')
+        sorted_timestamps = timestamps[order]
+        keep = order[np.concatenate((sorted_timestamps[1:] != sorted_timestamps[:-1], [True]))]
+
+        def merged(column, other_column):
+            return np.concatenate((column, other_column))[keep]
+
+        return BarStore.from_ticks(timestamps[keep], merged(self.open_ticks, other.open_ticks),
+                                   merged(self.high_ticks, other.high_ticks), merged(self.low_ticks, other.low_ticks),
+                                   merged(self.close_ticks, other.close_ticks), merged(self.volume, other.volume))
+
+    def save(self, path, metadata=None, compressed=False):
+        """Write the bars (and optionally their "Meta Data") to a NumPy .npz file atomically.
+
+        Args:
+            path (str): Destination file, conventionally ending in ".npz".
+            metadata (dict, optional): Metadata stored along with the bars.
+            compressed (bool, optional): Compress the columns (smaller, slower to load). Default is False.
+        """
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        savez = np.savez_compressed if compressed else np.savez
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                savez(f, timestamps=self.timestamps.astype(np.int64), open=self.open_ticks, high=self.high_ticks,
+                      low=self.low_ticks, close=self.close_ticks, volume=self.volume,
+                      metadata=np.array(json.dumps(metadata or {})))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """Read bars written by save().
+
+        Args:
+            path (str): The .npz file.
+
+        Returns:
+            tuple: The BarStore and the stored metadata dict.
+        """
+
+        with np.load(path) as data:
+            timestamps = data['timestamps'].astype('datetime64[s]')
+            prices = [data[name] for name in ('open', 'high', 'low', 'close')]
+            bars = cls.from_ticks(timestamps, *prices, data['volume'])
+            metadata = json.loads(str(data['metadata']))
+        return bars, metadata
+
+    def column(self, parameter):
+        """Get the column for a time series field key.
+
+        Args:
+            parameter (str): A field key such as '1. open' or '5. volume'.
+
+        Returns:
+            numpy.ndarray or None: The column in ascending time order (prices as float64), or None for an
+                unknown key.
+        """
+
+        columns = {
+            OPEN_KEY: self.open,
+            HIGH_KEY: self.high,
+            LOW_KEY: self.low,
+            CLOSE_KEY: self.close,
+            VOLUME_KEY: self.volume,
+        }
+        return columns.get(parameter)
+
+    def timestamp_str(self, index):
+        """Format the timestamp of the bar at 'index' the way the service does (e.g. "2023-11-03 15:00:00")."""
+
+        return str(self.timestamps[index]).replace('T', ' ')
+
+    def bar(self, index):
+        """Get the bar at 'index' as a dict in the response format (string values).
+
+        Args:
+            index (int): Position of the bar in ascending time order.
+
+        Returns:
+            dict: Bar fields keyed like the response, e.g. {"1. open": "148.1500", ...}.
+        """
+
+        return {
+            OPEN_KEY: format_ticks(self.open_ticks[index]),
+            HIGH_KEY: format_ticks(self.high_ticks[index]),
+            LOW_KEY: format_ticks(self.low_ticks[index]),
+            CLOSE_KEY: format_ticks(self.close_ticks[index]),
+            VOLUME_KEY: str(int(self.volume[index])),
+        }
+
+    def to_time_series(self):
+        """Rebuild the "Time Series (Nmin)" dict, newest bar first as in the response.
+
+        Returns:
+            dict: Mapping of timestamp strings to bar dicts.
+        """
+
+        return {self.timestamp_str(i): self.bar(i) for i in range(len(self) - 1, -1, -1)}
+
+
+# regular trading session (US/Eastern) used to derive regular hours bars from an extended hours series
+REGULAR_SESSION_START = datetime.time(9, 30)
+REGULAR_SESSION_END = datetime.time(16, 0)
+# extended hours session (US/Eastern): pre-market from 04:00, post-market until 20:00
+EXTENDED_SESSION_START = datetime.time(4, 0)
+EXTENDED_SESSION_END = datetime.time(20, 0)
+
+
+def _seconds_of_day(time):
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+class StreamingBarDecoder():
+    """Incremental decoder of a TIME_SERIES_INTRADAY JSON body, fed chunk by chunk.
+
+    Each complete bar of the "Time Series (Nmin)" section is matched in the buffered bytes and its values are
+    converted in bulk per chunk into preallocated NumPy columns (prices as int64 ticks), so peak memory stays close
+    to the size of the columns instead of several times the payload. Bar fields are expected in the order the
+    service sends them.
+
+    Usage:
+        decoder = StreamingBarDecoder("IBM")
+        for chunk in response.iter_content(chunk_size=65536):
+            decoder.feed(chunk)
+        metadata, bars = decoder.finish()
+    """
+
+    _META_PATTERN = re.compile(rb'"Meta Data"\s*:\s*(\{[^{}]*\})')
+    _SERIES_PATTERN = re.compile(rb'"Time Series \([^)]*\)"\s*:\s*\{')
+    _SEPARATOR_PATTERN = re.compile(rb'[\s,]*')
+    _BAR_PATTERN = re.compile(
+        rb'"([^"]+)"\s*:\s*\{\s*'
+        rb'"1\. open"\s*:\s*"([^"]*)"\s*,\s*'
+        rb'"2\. high"\s*:\s*"([^"]*)"\s*,\s*'
+        rb'"3\. low"\s*:\s*"([^"]*)"\s*,\s*'
+        rb'"4\. close"\s*:\s*"([^"]*)"\s*,\s*'
+        rb'"5\. volume"\s*:\s*"([^"]*)"\s*\}')
+    # approximate size of one bar in the pretty printed response, used to preallocate from Content-Length
+    _BYTES_PER_BAR = 180
+
+    def __init__(self, symbol, size_hint=0):
+        """Initialize a StreamingBarDecoder.
+
+        Args:
+            symbol (str): The stock symbol requested, used in error messages.
+            size_hint (int, optional): Expected size of the body in bytes, used to preallocate the columns.
+        """
+
+        self.symbol = symbol
+        self.metadata = None
+        self._buffer = b''
+        self._state = 'head'  # 'head' before the time series, 'series' inside it, 'tail' after it
+        self._count = 0
+        capacity = max(1024, size_hint // self._BYTES_PER_BAR)
+        self._timestamps = np.empty(capacity, dtype='S19')
+        self._prices = np.empty((4, capacity), dtype=np.int64)
+        self._volumes = np.empty(capacity, dtype=np.int64)
+
+    def _append(self, rows):
+        self._append_columns(list(zip(*rows)))
+
+    def _append_columns(self, columns):
+        """Convert and append columns of byte strings: timestamps, open, high, low, close and volume."""
+
+        end = self._count + len(columns[0])
+        if end > len(self._volumes):
+            capacity = max(end, 2 * len(self._volumes))
+            self._timestamps = np.resize(self._timestamps, capacity)
+            self._prices = np.concatenate(
+                (self._prices, np.empty((4, capacity - self._prices.shape[1]), dtype=np.int64)), axis=1)
+            self._volumes = np.resize(self._volumes, capacity)
+
+        self._timestamps[self._count:end] = [timestamp.strip() for timestamp in columns[0]]
+        for i in range(4):
+            self._prices[i, self._count:end] = to_ticks(np.array(columns[i + 1]))
+        self._volumes[self._count:end] = np.array(columns[5]).astype(np.int64)
+        self._count = end
+
+    def _find_metadata(self, data):
+        if self.metadata is None:
+            match = self._META_PATTERN.search(data)
+            if match:
+                self.metadata = json.loads(match.group(1))
+
+    def feed(self, chunk):
+        """Decode the complete bars in the data received so far.
+
+        Args:
+            chunk (bytes): The next part of the response body.
+        """
+
+        buffer = self._buffer + chunk
+        if self._state == 'head':
+            match = self._SERIES_PATTERN.search(buffer)
+            if not match:
+                self._buffer = buffer
+                return
+            self._find_metadata(buffer[:match.start()])
+            buffer = buffer[match.end():]
+            self._state = 'series'
+
+        if self._state == 'series':
+            rows = []
+            position = 0
+            while True:
+                position = self._SEPARATOR_PATTERN.match(buffer, position).end()
+                if buffer[position:position + 1] == b'}':
+                    position += 1
+                    self._state = 'tail'
+                    break
+                match = self._BAR_PATTERN.match(buffer, position)
+                if match is None:
+                    # an incomplete bar; anything else than a bar is an unexpected format
+                    if len(buffer) - position > 4096:
+                        raise ValueError(f"Unexpected time series format in the response for: {self.symbol}")
+                    break
+                rows.append(match.groups())
+                position = match.end()
+            if rows:
+                self._append(rows)
+            buffer = buffer[position:]
+
+        self._buffer = buffer
+
+    def finish(self):
+        """Complete the decoding once the whole body has been fed.
+
+        Returns:
+            tuple: The "Meta Data" dict and the BarStore of the response.
+
+        Raises:
+            ThrottleException: The body is a rate limit "Note" or "Information" message.
+            NoDataException: The body has no "Meta Data".
+        """
+
+        if self._state == 'head':
+            # no time series at all: an error message, or metadata only
+            json_data = json.loads(self._buffer or b'{}')
+            _check_response(json_data, self.symbol)
+            return json_data["Meta Data"], BarStore.empty()
+        if self._state == 'series':
+            raise ValueError(f"Truncated time series in the response for: {self.symbol}")
+
+        self._find_metadata(self._buffer)
+        if self.metadata is None:
+            raise NoDataException(f"No valid data found in the response for ticket symbol: {self.symbol}")
+
+        count = self._count
+        timestamps = self._timestamps[:count].astype('datetime64[s]')
+        prices = self._prices[:, :count]
+        volumes = self._volumes[:count]
+        # the service sends the newest bar first
+        order = np.argsort(timestamps, kind='stable')
+        bars = BarStore.from_ticks(timestamps[order], prices[0][order], prices[1][order], prices[2][order],
+                                   prices[3][order], volumes[order])
+        self._buffer = b''
+        metrics.increment('bars_parsed', count)
+        return self.metadata, bars
+
+
+class StreamingCsvDecoder(StreamingBarDecoder):
+    """Incremental decoder of a TIME_SERIES_INTRADAY body requested with datatype=csv.
+
+    The body is a header line "timestamp,open,high,low,close,volume" and one line per bar, newest first. The
+    complete lines of each chunk are split in one pass and converted in bulk into the bar columns. The CSV
+    carries no "Meta Data", so it is derived from the bars; errors and throttling messages still come as JSON.
+
+    Usage:
+        decoder = StreamingCsvDecoder("IBM", "30min")
+        for chunk in response.iter_content(chunk_size=65536):
+            decoder.feed(chunk)
+        metadata, bars = decoder.finish()
+    """
+
+    _HEADER = b'timestamp,open,high,low,close,volume'
+    # approximate size of one CSV line, used to preallocate from Content-Length
+    _BYTES_PER_BAR = 56
+
+    def __init__(self, symbol, interval, size_hint=0):
+        """Initialize a StreamingCsvDecoder.
+
+        Args:
+            symbol (str): The stock symbol requested, used in error messages and the derived metadata.
+            interval (str): The interval requested, e.g. "30min", used in the derived metadata.
+            size_hint (int, optional): Expected size of the body in bytes, used to preallocate the columns.
+        """
+
+        super().__init__(symbol, size_hint)
+        self.interval = interval
+
+    def feed(self, chunk):
+        """Decode the complete lines in the data received so far.
+
+        Args:
+            chunk (bytes): The next part of the response body.
+        """
+
+        buffer = self._buffer + chunk
+        if self._state == 'head':
+            stripped = buffer.lstrip()
+            if stripped[:1] == b'{':
+                # an error message in JSON, decoded by finish()
+                self._buffer = buffer
+                return
+            newline = buffer.find(b'\n')
+            if newline < 0:
+                self._buffer = buffer
+                return
+            if buffer[:newline].strip() != self._HEADER:
+                raise ValueError(f"Unexpected CSV header in the response for: {self.symbol}")
+            buffer = buffer[newline + 1:]
+            self._state = 'series'
+
+        end = buffer.rfind(b'\n')
+        if end >= 0:
+            lines = buffer[:end].replace(b'\r', b'').strip()
+            if lines:
+                fields = lines.replace(b'\n', b',').split(b',')
+                if len(fields) % 6:
+                    raise ValueError(f"Unexpected CSV format in the response for: {self.symbol}")
+                self._append_columns([fields[i::6] for i in range(6)])
+            buffer = buffer[end + 1:]
+        self._buffer = buffer
+
+    def finish(self):
+        """Complete the decoding once the whole body has been fed.
+
+        Returns:
+            tuple: The "Meta Data" dict derived from the bars and the BarStore of the response.
+
+        Raises:
+            ThrottleException: The body is a rate limit "Note" or "Information" message.
+            NoDataException: The body is an error message or holds no bars.
+        """
+
+        if self._state == 'head':
+            json_data = json.loads(self._buffer or b'{}') if self._buffer.lstrip()[:1] == b'{' else {}
+            _check_response(json_data, self.symbol)
+            raise NoDataException(f"No valid data found in the response for ticket symbol: {self.symbol}")
+        if self._buffer.strip():
+            # last line without a trailing newline
+            self.feed(b'\n')
+        self._state = 'tail'
+        self.metadata = {}
+        _, bars = super().finish()
+        return make_metadata(self.symbol, self.interval, bars), bars
+
+
+def make_metadata(symbol, interval, bars):
+    """Build the "Meta Data" of a response for bars held locally.
+
+    Args:
+        symbol (str): The stock symbol.
+        interval (str): The interval, e.g. "30min".
+        bars (BarStore): The bars.
+
+    Returns:
+        dict: Metadata in the format of the service.
+    """
+
+    return {
+        "1. Information": f"Intraday ({interval}) open, high, low, close prices and volume",
+        "2. Symbol": symbol,
+        "3. Last Refreshed": bars.timestamp_str(len(bars) - 1) if len(bars) else None,
+        "4. Interval": interval,
+        "5. Output Size": "Full size",
+        "6. Time Zone": "US/Eastern",
+    }
+
+
+class DailyBars():
+    """Daily OHLCV table aggregated from intraday bars, one row per day in ascending order.
+
+    Columns: 'dates' (datetime64[D]), 'open_ticks' (first bar open), 'high_ticks', 'low_ticks', 'close_ticks'
+    (last bar close), 'volume' (total), 'vwap' (volume weighted typical price, NaN for days without volume)
+    and 'bar_count' (number of intraday bars). 'open', 'high', 'low' and 'close' are float64 prices.
+    """
+
+    def __init__(self, dates, open_ticks, high_ticks, low_ticks, close_ticks, volumes, vwap, bar_count):
+        self.dates = dates
+        self.open_ticks = open_ticks
+        self.high_ticks = high_ticks
+        self.low_ticks = low_ticks
+        self.close_ticks = close_ticks
+        self.volume = volumes
+        self.vwap = vwap
+        self.bar_count = bar_count
+
+    @property
+    def open(self):
+        return self.open_ticks / PRICE_SCALE
+
+    @property
+    def high(self):
+        return self.high_ticks / PRICE_SCALE
+
+    @property
+    def low(self):
+        return self.low_ticks / PRICE_SCALE
+
+    @property
+    def close(self):
+        return self.close_ticks / PRICE_SCALE
+
+    @classmethod
+    def from_bars(cls, bars):
+        """Aggregate a BarStore by day.
+
+        Args:
+            bars (BarStore): Intraday bars in ascending time order.
+
+        Returns:
+            DailyBars: The daily table.
+        """
+
+        days = bars.timestamps.astype('datetime64[D]')
+        if not len(days):
+            ticks = np.empty(0, dtype=np.int64)
+            return cls(days, ticks, ticks, ticks, ticks, ticks, np.empty(0, dtype=np.float64), ticks)
+
+        starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+        ends = np.concatenate((starts[1:], [len(days)])) - 1
+        volumes = np.add.reduceat(bars.volume, starts)
+        # turnover in ticks * 3, exact as long as a day stays below 2**63
+        typical_ticks = bars.high_ticks + bars.low_ticks + bars.close_ticks
+        turnover = np.add.reduceat(typical_ticks * bars.volume, starts)
+        vwap = np.full(len(starts), np.nan)
+        np.divide(turnover, volumes * (3 * PRICE_SCALE), out=vwap, where=volumes > 0)
+
+        return cls(days[starts], bars.open_ticks[starts], np.maximum.reduceat(bars.high_ticks, starts),
+                   np.minimum.reduceat(bars.low_ticks, starts), bars.close_ticks[ends], volumes, vwap,
+                   ends - starts + 1)
+
+    def __len__(self):
+        return len(self.dates)
+
+
+def _is_batch_context():
+    """Whether no one can look at an interactive plot window: no terminal, or no display on Linux."""
+
+    if not sys.stdin or not sys.stdin.isatty():
+        return True
+    return sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def _pyplot():
+    """Import matplotlib.pyplot on first use, with the non-interactive Agg backend in batch contexts.
+
+    An explicit MPLBACKEND environment variable or a pyplot already imported by the caller is left alone.
+    """
+
+    if 'matplotlib.pyplot' not in sys.modules and not os.environ.get('MPLBACKEND') and _is_batch_context():
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _same_bar(bars, index, other, other_index):
+    """Whether bar 'index' of 'bars' and bar 'other_index' of 'other' have the same values."""
+
+    return all(getattr(bars, column)[index] == getattr(other, column)[other_index]
+               for column in ('timestamps', 'open', 'high', 'low', 'close', 'volume'))
+
+
+class _StoreOnlyCache():
+    """View of a ResponseCache that stores responses but never answers a lookup, for requests that must be fresh."""
+
+    offline = False
+    store_only = True
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, params):
+        return None
+
+    def put(self, params, json_data):
+        self.cache.put(params, json_data)
+
+    def get_bars(self, params):
+        return None
+
+    def put_bars(self, params, metadata, bars):
+        self.cache.put_bars(params, metadata, bars)
+
+
+def _cache_lookup(params, cache):
+    """Return the cached response of a request, or None; raise NoDataException on an offline miss."""
+
+    if cache is None:
+        return None
+    json_data = cache.get(params)
+    metrics.increment('cache_hits' if json_data is not None else 'cache_misses')
+    if json_data is None and cache.offline:
+        raise NoDataException(f"No cached data available offline for ticket symbol: {params.get('symbol')}")
+    return json_data
+
+
+def _cached_bars(params, series_key, cache):
+    """Return the cached "Meta Data" and BarStore of a request, or None; raise NoDataException on an offline miss.
+
+    Bars stored by put_bars() are read as columns; a response stored as JSON (or a fixture) is parsed.
+    """
+
+    if cache is None:
+        return None
+    cached = cache.get_bars(params)
+    if cached is None:
+        json_data = cache.get(params)
+        if json_data is not None:
+            cached = json_data.get("Meta Data", {}), BarStore.from_time_series(json_data.get(series_key))
+    metrics.increment('cache_hits' if cached is not None else 'cache_misses')
+    if cached is None and cache.offline:
+        raise NoDataException(f"No cached data available offline for ticket symbol: {params.get('symbol')}")
+    return cached
+
+
+def _check_response(json_data, symbol):
+    """Raise ThrottleException or NoDataException when a parsed response holds no "Meta Data"."""
+
+    if "Meta Data" not in json_data:
+        message = json_data.get("Note") or json_data.get("Information")
+        if message:
+            metrics.increment('throttle_replies')
+            raise ThrottleException(f"Request throttled for ticket symbol: {symbol}: {message}")
+        raise NoDataException(f"No valid data found in the response for ticket symbol: {symbol}")
+
+
+def download_json(params, cache=None, session=None, limiter=None):
+    """Send a query to the Alphavantage API and parse the JSON response.
+
+    Args:
+        params (dict): Query parameters, including the API key.
+        cache (ResponseCache, optional): Response cache consulted before the API and updated after it.
+        session (requests.Session, optional): Session whose connection pool is reused for the request.
+        limiter (RateLimiter, optional): Rate limiter acquired right before the HTTP request; cache hits
+            take no token.
+
+    Returns:
+        dict: The parsed response.
+
+    Raises:
+        ThrottleException: The service answered with a rate limit "Note" or "Information" message.
+        NoDataException: The request failed, the response has no "Meta Data", or nothing is cached for an
+            offline cache.
+        QuotaExceededException: The daily quota of 'limiter' is used up.
+    """
+
+    json_data = _cache_lookup(params, cache)
+    if json_data is not None:
+        return json_data
+
+    import requests  # deferred: cache-only and offline readers never pay for it
+
+    if limiter is not None:
+        limiter.acquire()
+
+    try:
+        metrics.increment('requests')
+        with metrics.timer('fetch'):
+            response = (session or requests).get(BASE_URL, params=params)
+            response.raise_for_status()  # HTTP errors?
+        metrics.increment('bytes_received', len(response.content))
+        with metrics.timer('parse'):
+            json_data = json.loads(response.text)
+        _check_response(json_data, params.get('symbol'))
+    except requests.exceptions.RequestException as e:
+        raise NoDataException(f"Request failed for ticket symbol: {params.get('symbol')}: {e}") from e
+
+    if cache is not None:
+        cache.put(params, json_data)
+    return json_data
+
+
+def make_decoder(params, size_hint=0):
+    """Create the streaming decoder of the response to a request: CSV for datatype=csv, JSON otherwise."""
+
+    if params.get('datatype') == 'csv':
+        return StreamingCsvDecoder(params.get('symbol'), params.get('interval'), size_hint)
+    return StreamingBarDecoder(params.get('symbol'), size_hint)
+
+
+def download_bars(params, series_key, cache=None, session=None, limiter=None):
+    """Send a query to the Alphavantage API and decode the response body as it streams in.
+
+    Bars go straight into NumPy columns through a StreamingBarDecoder, or a StreamingCsvDecoder for
+    datatype=csv requests; no per-bar dicts are built, and the columns are what the cache stores (put_bars()).
+
+    Args:
+        params (dict): Query parameters, including the API key.
+        series_key (str): Key of the time series section, e.g. "Time Series (30min)".
+        cache (ResponseCache, optional): Response cache consulted before the API and updated after it.
+        session (requests.Session, optional): Session whose connection pool is reused for the request.
+        limiter (RateLimiter, optional): Rate limiter acquired right before the HTTP request; cache hits
+            take no token.
+
+    Returns:
+        tuple: The "Meta Data" dict and the BarStore of the response.
+
+    Raises:
+        ThrottleException: The service answered with a rate limit "Note" or "Information" message.
+        NoDataException: The request failed, the response has no "Meta Data", or nothing is cached for an
+            offline cache.
+        QuotaExceededException: The daily quota of 'limiter' is used up.
+    """
+
+    cached = _cached_bars(params, series_key, cache)
+    if cached is not None:
+        return cached
+
+    import requests  # deferred: cache-only and offline readers never pay for it
+
+    if limiter is not None:
+        limiter.acquire()
+
+    try:
+        metrics.increment('requests')
+        # fetching and parsing overlap when streaming, so they share one timer
+        with metrics.timer('fetch_stream'), (session or requests).get(BASE_URL, params=params, stream=True) as response:
+            response.raise_for_status()  # HTTP errors?
+            decoder = make_decoder(params, int(response.headers.get('Content-Length') or 0))
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                metrics.increment('bytes_received', len(chunk))
+                decoder.feed(chunk)
+            metadata, bars = decoder.finish()
+    except requests.exceptions.RequestException as e:
+        raise NoDataException(f"Request failed for ticket symbol: {params.get('symbol')}: {e}") from e
+
+    if cache is not None:
+        cache.put_bars(params, metadata, bars)
+    return metadata, bars
+
+
+def write_bar_file_from_response(json_data, path, extended_hours=False):
+    """Convert a downloaded or cached response into a bar file for Price.from_mmap().
+
+    Args:
+        json_data (dict): The parsed response, e.g. from download_json() or ResponseCache.get().
+        path (str): Destination file.
+        extended_hours (bool, optional): Whether the response includes extended hours bars. Default is False.
+    """
+
+    metadata = json_data["Meta Data"]
+    interval = metadata["4. Interval"]
+    bars = BarStore.from_time_series(json_data.get("Time Series (" + interval + ")"))
+    header = {
+        'symbol': metadata["2. Symbol"],
+        'minutes': int(interval[:-3]),
+        'extended_hours': extended_hours,
+        'metadata': metadata,
+    }
+    write_bar_file(path, bars, header)
+
+
+_PREFETCH_WORKERS = 8
+_prefetch_pool = None
+_prefetch_pool_lock = threading.Lock()
+
+
+def _prefetch_executor():
+    """Thread pool shared by Price.prefetch(), created on first use."""
+
+    global _prefetch_pool
+    with _prefetch_pool_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS,
+                                                                   thread_name_prefix='alphavantage-prefetch')
+        return _prefetch_pool
+
+
+def load_all(instruments, max_workers=_PREFETCH_WORKERS, limiter=None):
+    """Load many (lazy) Price instances in parallel; an instrument that fails does not stop the others.
+
+    Args:
+        instruments (list): Price, PriceExtended or StockDataAnalyzer instances; loaded ones are skipped.
+        max_workers (int, optional): Number of concurrent downloads.
+        limiter (RateLimiter, optional): Rate limiter acquired before each HTTP request (not for cache hits),
+            given to the instruments that have none.
+
+    Returns:
+        dict: Instrument to the exception of each instrument that failed to load (empty when all loaded).
+    """
+
+    def load(instrument):
+        if instrument.limiter is None:
+            instrument.limiter = limiter
+        instrument.load()
+
+    pending = [instrument for instrument in instruments if not instrument.is_loaded()]
+    errors = {}
+    if not pending:
+        return errors
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+        futures = {executor.submit(load, instrument): instrument for instrument in pending}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors[futures[future]] = e
+    return errors
+
+
+def resampled_view(metadata, bars, minutes, new_minutes, align='session'):
+    """Resample bars of 'minutes' into bars of 'new_minutes' along with their "Meta Data".
+
+    Args:
+        metadata (dict): "Meta Data" of the bars.
+        bars (BarStore): The bars.
+        minutes (int): Interval of the bars in minutes.
+        new_minutes (int): The new interval, a multiple of 'minutes'.
+        align (str, optional): See BarStore.resample(). Default is 'session'.
+
+    Returns:
+        tuple: The "Meta Data" dict and the BarStore of the new interval.
+
+    Raises:
+        ValueError: 'new_minutes' is not a multiple of 'minutes'.
+    """
+
+    if new_minutes % minutes:
+        raise ValueError(f"Cannot resample {minutes}min bars into {new_minutes}min bars")
+    new_bars = bars.resample(new_minutes, align)
+    interval = f'{new_minutes}min'
+    new_metadata = dict(metadata)
+    new_metadata.update({
+        "1. Information": f"Intraday ({interval}) open, high, low, close prices and volume",
+        "3. Last Refreshed": new_bars.timestamp_str(len(new_bars) - 1) if len(new_bars) else None,
+        "4. Interval": interval,
+    })
+    return new_metadata, new_bars
+
+
+class PriceSource():
+    """One download of a symbol's extended hours series, shared by every Price view built from it.
+
+    The regular hours view is derived from the extended hours bars by keeping the bars that start
+    within the regular session, so 'Price', 'PriceExtended' and 'StockDataAnalyzer' built with
+    'from_source' cost a single request and a single parse.
+
+    Usage:
+        source = PriceSource("IBM", 30, apikey)
+        ticker_symbol = Price.from_source(source)
+        data_analyzer = StockDataAnalyzer.from_source(source)
+    """
+
+    def __init__(self, symbol, minutes, apikey, cache=None, session=None, stream=False, datatype='json',
+                 limiter=None):
+        """Initialize a PriceSource; nothing is downloaded until the first view is requested.
+
+        Args:
+            symbol (str): The stock symbol of interest.
+            minutes (int): The time interval in minutes for data retrieval.
+            apikey (str): Your API key for accessing financial data.
+            cache (ResponseCache, optional): Response cache consulted before the API. Default is Price.default_cache.
+            session (requests.Session, optional): Session used for the download.
+            stream (bool, optional): Decode the response as it streams in. Default is False.
+            datatype (str, optional): 'json' or 'csv' (smaller, decoded as it streams in). Default is 'json'.
+            limiter (RateLimiter, optional): Rate limiter acquired right before the HTTP request, not for a
+                cached response.
+        """
+
+        self.symbol = symbol
+        self.minutes = minutes
+        self.apikey = apikey
+        self.cache = cache
+        self.session = session
+        self.stream = stream
+        self.datatype = datatype
+        self.limiter = limiter
+        self._views = {}
+
+    def load(self):
+        """Download the extended hours series now unless it is already loaded."""
+
+        if (True, self.minutes) not in self._views:
+            self._load()
+
+    def _load(self):
+        price = Price.__new__(Price)
+        price._init_params(self.symbol, self.minutes, self.apikey, True, self.cache, self.stream, self.datatype)
+        price.session = self.session
+        price.limiter = self.limiter
+        price._set_data(*price._fetch())
+        self._views[(True, self.minutes)] = (price.metadata, price.bars)
+
+    def view(self, extended_hours, minutes=None):
+        """Get the metadata and bars of the extended or the regular hours series.
+
+        Args:
+            extended_hours (bool): Whether to include extended hours bars.
+            minutes (int, optional): Interval of the view, a multiple of the downloaded interval; coarser views
+                are resampled locally (see BarStore.resample()). Default is the downloaded interval.
+
+        Returns:
+            tuple: The "Meta Data" dict and the BarStore of the view.
+        """
+
+        self.load()
+        minutes = self.minutes if minutes is None else minutes
+        key = (extended_hours, minutes)
+        if key not in self._views:
+            if minutes != self.minutes:
+                metadata, bars = self.view(extended_hours)
+                self._views[key] = resampled_view(metadata, bars, self.minutes, minutes)
+            else:
+                metadata, bars = self._views[(True, self.minutes)]
+                regular_bars = bars.select(bars.session_mask(REGULAR_SESSION_START, REGULAR_SESSION_END))
+                regular_metadata = dict(metadata)
+                if len(regular_bars):
+                    regular_metadata["3. Last Refreshed"] = regular_bars.timestamp_str(len(regular_bars) - 1)
+                self._views[key] = (regular_metadata, regular_bars)
+        return self._views[key]
+
 class Price():
     """
     AlphavantagePrice.py defines a module containing Python classes: 'Price', 'PriceExtended' and 'StockDataAnalyzer.'
@@ -65,7 +1201,15 @@ class Price():
     Date: 10-15-2023
     """
 
-    def __init__(self, in_symbol, minutes, apikey, extended_hours=False):
+    # cache used by instances created without an explicit one, e.g. an alphavantage_cache.ResponseCache
+    default_cache = None
+    # session of the view built by from_source
+    source_extended_hours = False
+    # scheduler used by instances created without an explicit one, e.g. an alphavantage_scheduler.RequestScheduler
+    default_scheduler = None
+
+    def __init__(self, in_symbol, minutes, apikey, extended_hours=False, cache=None, stream=False, lazy=False,
+                 datatype='json'):
         """Initialize a Price instance.
 
         Args:
@@ -73,13 +1217,196 @@ class Price():
             minutes (int): The time interval in minutes for data retrieval.
             apikey (str): Your API key for accessing financial data (hash key version used)
             extended_hours (bool, optional): Whether to include extended hours data. Default is False.
+            cache (ResponseCache, optional): Response cache consulted before the API. Default is Price.default_cache.
+            stream (bool, optional): Decode the response as it streams in, straight into the bar columns.
+                Default is False.
+            lazy (bool, optional): Only record the parameters; download on first access to the data, or
+                earlier with prefetch() / load_all(). Default is False.
+            datatype (str, optional): Response format, 'json' or 'csv'. CSV is smaller on the wire and is always
+                decoded as it streams in; the data is the same either way. Default is 'json'.
         """
 
+        self._init_params(in_symbol, minutes, apikey, extended_hours, cache, stream, datatype)
+        if not lazy:
+            self.load()
+
+    def _init_params(self, in_symbol, minutes, apikey, extended_hours, cache, stream=False, datatype='json'):
         self.interval_mins = f'{minutes}min'
         self.symbol = in_symbol
         self.apikey = apikey
         self.extended_hours = extended_hours
-        self.json_data = self.download_data()
+        self.cache = cache if cache is not None else Price.default_cache
+        self.stream = stream
+        if datatype not in ('json', 'csv'):
+            raise ValueError(f"Unsupported datatype: {datatype}")
+        self.datatype = datatype
+        self.session = None
+        # rate limiter acquired right before each HTTP request, so cache hits take no token
+        self.limiter = None
+        # requests go through scheduler.fetch(params, cache, priority, series_key) when set
+        self.scheduler = Price.default_scheduler
+        # priority of the requests in the scheduler, None for its default (interactive)
+        self.priority = None
+        # 'YYYY-MM' to request one month of history instead of the latest bars
+        self.month = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._resampled = {}
+
+    def load(self):
+        """Download the data now unless it is already loaded; safe to call from several threads."""
+
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._set_data(*self._fetch())
+
+    def is_loaded(self):
+        """Whether the data has been downloaded (always True unless constructed with lazy=True)."""
+
+        return self._loaded
+
+    def prefetch(self):
+        """Start loading the data in a background thread.
+
+        Returns:
+            concurrent.futures.Future: Completes when the data is loaded; its result() re-raises download errors.
+        """
+
+        return _prefetch_executor().submit(self.load)
+
+    @property
+    def metadata(self):
+        """dict: The "Meta Data" of the response, downloaded on first access for lazy instances."""
+
+        self.load()
+        return self._metadata
+
+    @property
+    def bars(self):
+        """BarStore: The bars in ascending time order, downloaded on first access for lazy instances."""
+
+        self.load()
+        return self._bars
+
+    def _fetch(self, outputsize='full', fresh=False):
+        """Download the bars, streaming or through download_data().
+
+        Args:
+            outputsize (str, optional): 'full' or 'compact'. Default is 'full'.
+            fresh (bool, optional): Do not answer from the cache (unless offline); the response is still stored
+                in it. Default is False.
+
+        Returns:
+            tuple: The "Meta Data" dict and the BarStore of the response.
+        """
+
+        cache = self._request_cache(fresh)
+        if self.stream or self.datatype == 'csv':
+            if self.scheduler is not None:
+                return self._schedule(self._query_params(outputsize), self._time_series_key(), cache)
+            return download_bars(self._query_params(outputsize), self._time_series_key(), cache, self.session,
+                                 self.limiter)
+        if outputsize == 'full' and not fresh:
+            json_data = self.download_data()
+        elif self.scheduler is not None:
+            json_data = self._schedule(self._query_params(outputsize), cache=cache)
+        else:
+            json_data = download_json(self._query_params(outputsize), cache, self.session, self.limiter)
+        return json_data.get("Meta Data", {}), BarStore.from_time_series(json_data.get(self._time_series_key()))
+
+    @classmethod
+    def from_source(cls, source, extended_hours=None, minutes=None):
+        """Build an instance from a PriceSource without downloading again.
+
+        Args:
+            source (PriceSource): The shared download of the symbol.
+            extended_hours (bool, optional): Whether to include extended hours bars.
+                Default is the session the class downloads (regular hours, extended for StockDataAnalyzer).
+            minutes (int, optional): Interval, a multiple of the source interval resampled locally.
+                Default is the source interval.
+
+        Returns:
+            Price: An instance of the class holding the requested view of the source.
+        """
+
+        if extended_hours is None:
+            extended_hours = cls.source_extended_hours
+        minutes = source.minutes if minutes is None else minutes
+        metadata, bars = source.view(extended_hours, minutes)
+        return cls.from_bars(source.symbol, minutes, bars, metadata, source.apikey, extended_hours, source.cache)
+
+    @classmethod
+    def from_bars(cls, symbol, minutes, bars, metadata=None, apikey=None, extended_hours=None, cache=None):
+        """Build an instance from bars already held locally, without downloading.
+
+        Args:
+            symbol (str): The stock symbol of the bars.
+            minutes (int): The time interval of the bars in minutes.
+            bars (BarStore): The bars.
+            metadata (dict, optional): "Meta Data" of the bars. Default is metadata derived from the bars.
+            apikey (str, optional): API key used if the instance downloads later (e.g. refresh()).
+            extended_hours (bool, optional): Whether the bars include extended hours.
+                Default is the session the class downloads (regular hours, extended for StockDataAnalyzer).
+            cache (ResponseCache, optional): Response cache consulted before the API.
+
+        Returns:
+            Price: An instance of the class holding the bars.
+        """
+
+        if extended_hours is None:
+            extended_hours = cls.source_extended_hours
+        instance = cls.__new__(cls)
+        instance._init_params(symbol, minutes, apikey, extended_hours, cache)
+        if metadata is None:
+            metadata = make_metadata(symbol, instance.interval_mins, bars)
+        instance._set_data(metadata, bars)
+        return instance
+
+    def _set_data(self, metadata, bars):
+        """Keep the metadata and bars and index the last refreshed bar once."""
+
+        self._metadata = metadata
+        self._bars = bars
+        self._json_data = None
+        self._resampled = {}
+        last_refreshed = metadata.get("3. Last Refreshed")
+        self._last_index = bars.index_of(last_refreshed) if last_refreshed and len(bars) else None
+        self._loaded = True
+
+    def _time_series_key(self):
+        return "Time Series (" + self.interval_mins + ")"
+
+    def resampled(self, minutes, align='session'):
+        """Get an instance of a coarser interval built from these bars, without another request.
+
+        Args:
+            minutes (int): The new interval in minutes, a multiple of this interval, e.g. 5, 15, 30 or 60 from
+                1 minute bars. Use daily_bars() / bars.daily() for daily bars.
+            align (str, optional): See BarStore.resample(). Default is 'session'.
+
+        Returns:
+            Price: An instance of the same class holding the resampled bars; cached until the bars change.
+
+        Raises:
+            ValueError: 'minutes' is not a multiple of this interval.
+        """
+
+        key = (minutes, align)
+        if key not in self._resampled:
+            metadata, bars = resampled_view(self.metadata, self.bars, int(self.interval_mins[:-3]), minutes, align)
+            self._resampled[key] = type(self).from_bars(self.symbol, minutes, bars, metadata, self.apikey,
+                                                        self.extended_hours, self.cache)
+        return self._resampled[key]
+
+    @property
+    def json_data(self):
+        """dict: The response as nested dicts, rebuilt lazily from the bar columns on first access."""
+
+        if self._json_data is None:
+            self._json_data = {"Meta Data": self.metadata, self._time_series_key(): self.bars.to_time_series()}
+        return self._json_data
 
     def download_data(self):
         """Download data from Alphavantage API and parse it into JSON format.
@@ -93,27 +1420,217 @@ class Price():
         extended hours, and API key. The response from the API is expected to be in JSON format,
         and it is parsed into a Python dictionary using json.loads.
 
+        When a cache is set, a fresh cached response is returned without any request, and every valid
+        response downloaded is stored in it. An offline cache never goes to the network.
+        With a scheduler, identical requests of concurrent callers share one download.
         """
 
+        if self.scheduler is not None:
+            return self._schedule(self._query_params())
+        return download_json(self._query_params(), self.cache, self.session, self.limiter)
+
+    def _request_cache(self, fresh=False):
+        """The cache of a request: write only for fresh requests, unless offline."""
+
+        if fresh and self.cache is not None and not self.cache.offline:
+            return _StoreOnlyCache(self.cache)
+        return self.cache
+
+    def _schedule(self, params, series_key=None, cache=None):
+        """Send a request through the scheduler, at the priority of this instance if set."""
+
+        cache = self.cache if cache is None else cache
+        if self.priority is None:
+            return self.scheduler.fetch(params, cache, series_key=series_key)
+        return self.scheduler.fetch(params, cache, self.priority, series_key)
+
+    def _query_params(self, outputsize='full'):
+        """Query parameters of the TIME_SERIES_INTRADAY request for this instance."""
+
         extended_hours_str = 'true' if self.extended_hours else 'false'
         params = {
             'function': 'TIME_SERIES_INTRADAY',
             'symbol': self.symbol,
             'interval': self.interval_mins,
             'extended_hours': extended_hours_str,
-            'outputsize': 'full',
+            'outputsize': outputsize,
             'apikey': self.apikey
         }
-        base_url = 'https://www.alphavantage.co/query'
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()  # HTTP errors?
-            json_data = json.loads(response.text)
-            if "Meta Data" not in json_data:
-                raise NoDataException(f"No valid data found in the response for ticket symbol: {self.symbol}")
-            return json_data
-        except requests.exceptions.RequestException as e:
-            raise SystemExit(e)
+        if self.month:
+            params['month'] = self.month
+        if self.datatype == 'csv':
+            params['datatype'] = 'csv'
+        return params
+
+    def refresh(self):
+        """Bring the bars up to date incrementally.
+
+        Requests the compact output (latest 100 bars) and merges the bars from the stored last bar onwards,
+        replacing that bar since it may have been revised. When the compact window starts after the stored
+        last bar (a possible gap), the full output is downloaded and merged instead; stored bars older than
+        its window are kept.
+
+        Returns:
+            int: Number of bars added.
+        """
+
+        count = len(self.bars)
+        self.poll()
+        return len(self.bars) - count
+
+    def poll(self, fresh=False):
+        """Bring the bars up to date like refresh() and get the bars that changed.
+
+        Args:
+            fresh (bool, optional): Send the compact request (and the full one on a gap) even when the cache holds
+                a reply for it, e.g. when polling right after a new bar is published; the reply is still stored.
+                Default is False.
+
+        Returns:
+            BarStore: The bars newer than the previous last bar, preceded by that bar when its values were
+                revised, in ascending time order. Every bar when nothing was loaded before.
+        """
+
+        if not self._loaded or not len(self._bars):
+            self._set_data(*self._fetch())
+            return self.bars
+
+        previous = self.bars
+        if not self._merge_compact(*self._fetch('compact', fresh)):
+            self._merge_full(*self._fetch(fresh=fresh))
+        return self._changed_since(previous)
+
+    def _merge_compact(self, update_metadata, update):
+        """Merge a compact reply from the stored last bar onwards, replacing that bar since it may be revised.
+
+        Args:
+            update_metadata (dict): "Meta Data" of the compact reply.
+            update (BarStore): Bars of the compact reply.
+
+        Returns:
+            bool: False, and nothing merged, when the reply starts after the stored last bar (a possible gap
+                that only the full output can fill).
+        """
+
+        last = self._bars.timestamps[-1]
+        if not len(update) or update.timestamps[0] > last:
+            return False
+        metadata = dict(self._metadata)
+        metadata.update(update_metadata)
+        # keep the size of the history, not the size of the compact reply
+        metadata["5. Output Size"] = self._metadata.get("5. Output Size", metadata.get("5. Output Size"))
+        self._set_data(metadata, self._bars.merge(update.between(last, None)))
+        return True
+
+    def _merge_full(self, update_metadata, update):
+        """Merge a full reply into the bars; its bars replace the stored ones, older stored bars are kept.
+
+        Args:
+            update_metadata (dict): "Meta Data" of the full reply.
+            update (BarStore): Bars of the full reply.
+        """
+
+        metadata = dict(self._metadata)
+        metadata.update(update_metadata)
+        self._set_data(metadata, self._bars.merge(update))
+
+    def _changed_since(self, previous):
+        """The bars newer than the last bar of 'previous', preceded by that bar when its values were revised."""
+
+        last = previous.timestamps[-1]
+        changed = self.bars.between(last, None)
+        if len(changed) and changed.timestamps[0] == last and _same_bar(changed, 0, previous, len(previous) - 1):
+            changed = changed[1:]
+        return changed
+
+    @classmethod
+    def for_month(cls, symbol, minutes, month, apikey, extended_hours=False, cache=None, session=None, limiter=None,
+                  scheduler=None, priority=None, lazy=False):
+        """Build an instance holding one past month of history (the 'month' parameter of the API).
+
+        Args:
+            symbol (str): The stock symbol of interest.
+            minutes (int): The time interval in minutes.
+            month (str): The month as 'YYYY-MM'.
+            apikey (str): Your API key for accessing financial data.
+            extended_hours (bool, optional): Whether to include extended hours data. Default is False.
+            cache (ResponseCache, optional): Response cache consulted before the API. Default is Price.default_cache.
+            session (requests.Session, optional): Session whose connection pool is reused for the request.
+            limiter (RateLimiter, optional): Rate limiter acquired right before the HTTP request.
+            scheduler (RequestScheduler, optional): Send the request through this scheduler.
+                Default is Price.default_scheduler.
+            priority (int, optional): Priority of the request in the scheduler, e.g. BATCH.
+            lazy (bool, optional): Only record the parameters; download on first access to the data.
+
+        Returns:
+            Price: An instance of the class holding the bars of the month.
+        """
+
+        instance = cls.__new__(cls)
+        instance._init_params(symbol, minutes, apikey, extended_hours, cache)
+        instance.month = month
+        instance.session = session
+        instance.limiter = limiter
+        if scheduler is not None:
+            instance.scheduler = scheduler
+        instance.priority = priority
+        if not lazy:
+            instance.load()
+        return instance
+
+    @classmethod
+    def from_archive(cls, archive, symbol, minutes, start=None, end=None, extended_hours=True):
+        """Build an instance from the partitions of a local archive covering [start, end].
+
+        Args:
+            archive (BarArchive or BarDatabase): The archive filled by a backfill (see alphavantage_backfill), or
+                the SQLite bar store (see alphavantage_store).
+            symbol (str): The stock symbol of interest.
+            minutes (int): The time interval in minutes.
+            start (str or datetime.datetime, optional): First timestamp included. Default is the oldest bar.
+            end (str or datetime.datetime, optional): Last timestamp included. Default is the newest bar.
+            extended_hours (bool, optional): Session of the archived bars. Default is True.
+
+        Returns:
+            Price: An instance of the class holding the bars of the range.
+        """
+
+        bars = archive.load_bars(symbol, minutes, start, end, extended_hours)
+        return cls.from_bars(symbol.upper(), minutes, bars, extended_hours=extended_hours, cache=None)
+
+    @classmethod
+    def from_mmap(cls, path, apikey=None, cache=None):
+        """Build an instance from a memory-mapped bar file, without parsing or copying the bars.
+
+        Args:
+            path (str): Bar file written by save_mmap() or write_bar_file_from_response().
+            apikey (str, optional): API key used if the instance downloads later (e.g. refresh()).
+            cache (ResponseCache, optional): Response cache consulted before the API.
+
+        Returns:
+            Price: An instance of the class whose bars are views on the mapped file.
+        """
+
+        header, columns = open_bar_file(path)
+        bars = BarStore.from_ticks(columns['timestamps'], columns['open_ticks'], columns['high_ticks'],
+                                   columns['low_ticks'], columns['close_ticks'], columns['volume'])
+        return cls.from_bars(header['symbol'], header['minutes'], bars, header.get('metadata'), apikey,
+                             header.get('extended_hours', False), cache)
+
+    def save_mmap(self, path):
+        """Write the bars to a bar file that Price.from_mmap() maps without decoding.
+
+        Args:
+            path (str): Destination file.
+        """
+
+        header = {
+            'symbol': self.symbol,
+            'minutes': int(self.interval_mins[:-3]),
+            'extended_hours': self.extended_hours,
+            'metadata': self.metadata,
+        }
+        write_bar_file(path, self.bars, header)
 
     def get_metadata(self):
         """Retrieve metadata information from the JSON data as dict obj.
@@ -127,8 +1644,7 @@ class Price():
         to get to symbol: symbol = metadata["2. Symbol"]
         """
 
-        metadata = self.json_data.get("Meta Data", {})
-        return metadata
+        return self.metadata
 
     def get_json(self):
         """Get the JSON data in a pretty-printed format for debugging.
@@ -177,74 +1693,67 @@ class Price():
              dict: Data for the last refreshed timestamp, or None if not found.
          """
 
-        last_refreshed = self.get_last_refreshed()
-        time_series = self.json_data.get("Time Series (" + self.interval_mins + ")")
+        self.load()
+        index = self._last_index
+        if index is None:
+            return None
+        return self.bars.bar(index)
 
-        if time_series:
-            for key, value in time_series.items():
-                if key.strip() == last_refreshed:
-                    data_for_last_refreshed = value
-                    return data_for_last_refreshed
+    def _last_refreshed_value(self, column):
+        index = self._last_index
+        if index is None:
+            return None
+        return column[index].item()
 
-        return None
+    def _last_refreshed_price(self, ticks):
+        # one tick conversion instead of a float view of the whole column
+        index = self._last_index
+        if index is None:
+            return None
+        return int(ticks[index]) / PRICE_SCALE
 
     def open(self):
         """Retrieve the stock's opening price for the last refreshed timestamp.
 
         Returns:
-            str: The opening price, or None if not found.
+            float: The opening price, or None if not found.
         """
-        daily_stats = self.get_data_for_last_refreshed()
-        if daily_stats:
-            return daily_stats["1. open"]
-        return None
+        return self._last_refreshed_price(self.bars.open_ticks)
 
     def high(self):
         """Retrieve the stock's highest price for the day at the last refreshed timestamp.
 
         Returns:
-            str: The highest price, or None if not found.
+            float: The highest price, or None if not found.
         """
-        daily_stats = self.get_data_for_last_refreshed()
-        if daily_stats:
-            return daily_stats["2. high"]
-        return None
+        return self._last_refreshed_price(self.bars.high_ticks)
 
     def low(self):
         """Retrieve the stock's lowest price for the day at the last refreshed timestamp.
 
         Returns:
-            str: The lowest price, or None if not found.
+            float: The lowest price, or None if not found.
         """
 
-        daily_stats = self.get_data_for_last_refreshed()
-        if daily_stats:
-            return daily_stats["3. low"]
-        return None
+        return self._last_refreshed_price(self.bars.low_ticks)
 
     def close(self):
         """Retrieve the stock's closing price for the last refreshed timestamp.
 
         Returns:
-            str: The closing price, or None if not found.
+            float: The closing price, or None if not found.
         """
 
-        daily_stats = self.get_data_for_last_refreshed()
-        if daily_stats:
-            return daily_stats["4. close"]
-        return None
+        return self._last_refreshed_price(self.bars.close_ticks)
 
     def volume(self):
         """Retrieve the volume data for the last refreshed timestamp.
 
         Returns:
-            str: The volume data, or None if not found.
+            int: The volume data, or None if not found.
         """
 
-        daily_stats = self.get_data_for_last_refreshed()
-        if daily_stats:
-            return daily_stats["5. volume"]
-        return None
+        return self._last_refreshed_value(self.bars.volume)
 
     def get_timestamps(self):
         """Get all timestamps from the time series data.
@@ -253,12 +1762,7 @@ class Price():
             list: A list of timestamps from the time series data, or an empty list if no data is found.
         """
 
-        time_series = self.json_data.get("Time Series (" + self.interval_mins + ")")
-        if time_series:
-            timestamps = [timestamp for timestamp in time_series.keys()]
-            print(timestamps)
-            return timestamps
-        return []
+        return [self.bars.timestamp_str(i) for i in range(len(self.bars) - 1, -1, -1)]
 
     def get_data_for_timestamp(self, timestamp):
         """Get data for a specific timestamp from the time series data.
@@ -271,25 +1775,63 @@ class Price():
             or None if the timestamp is not found in the data.
          """
 
-        time_series = self.json_data.get("Time Series (" + self.interval_mins + ")")
-        # for key, value in time_series.items():
-        #     print(f'{key} - {value}')
-        if time_series:
-            return time_series.get(timestamp)
-        return None
+        index = self.bars.index_of(timestamp)
+        if index is None:
+            return None
+        return self.bars.bar(index)
+
+    def indicators(self):
+        """Get the technical indicator engine of the bars (SMA, EMA, RSI, MACD, Bollinger Bands, ATR, VWAP).
+
+        Returns:
+            IndicatorEngine: Engine computing indicators locally, cached until the bars change.
+        """
+
+        if getattr(self, '_indicators', None) is None or self._indicators.bars is not self.bars:
+            self._indicators = IndicatorEngine(self.bars)
+        return self._indicators
+
+    def get_bars_between(self, start, end):
+        """Get the bars between two timestamps, both included.
+
+        Args:
+            start (str or datetime.datetime): First timestamp, e.g. "2023-11-01 09:30:00", or None.
+            end (str or datetime.datetime): Last timestamp, or None.
+
+        Returns:
+            BarStore: The bars in ascending time order (views on the loaded data).
+        """
+
+        return self.bars.between(start, end)
+
+    def get_bars_on(self, date):
+        """Get the bars of one day.
+
+        Args:
+            date (str or datetime.date): The day, e.g. "2023-11-03".
+
+        Returns:
+            BarStore: The bars in ascending time order (views on the loaded data).
+        """
+
+        return self.bars.on(date)
 
 
 class PriceExtended(Price):
-    def __init__(self, symbol, interval, api_key):
+    def __init__(self, symbol, interval, api_key, cache=None, stream=False, lazy=False, datatype='json'):
         """Initialize a PriceExtended instance.
 
         Args:
             symbol (str): The stock symbol of interest.
             interval (int): The time interval in minutes for data retrieval.
             api_key (str): Your API key for accessing financial data.
+            cache (ResponseCache, optional): Response cache consulted before the API.
+            stream (bool, optional): Decode the response as it streams in. Default is False.
+            lazy (bool, optional): Download on first access to the data instead of now. Default is False.
+            datatype (str, optional): Response format, 'json' or 'csv'. Default is 'json'.
         """
 
-        super().__init__(symbol, interval, api_key)
+        super().__init__(symbol, interval, api_key, cache=cache, stream=stream, lazy=lazy, datatype=datatype)
 
 
     def series(self, parameter):
@@ -299,18 +1841,18 @@ class PriceExtended(Price):
             parameter (str): The attribute for which to retrieve historical data (e.g., '1. open', '4. close').
 
         Returns:
-            list: A list of historical data values for the specified attribute, or an empty list if no data is found.
+            numpy.ndarray: The historical values for the specified attribute, newest first; empty (float64 for
+                an unknown attribute) if no data is found.
         """
-        time_series = self.json_data.get("Time Series (" + self.interval_mins + ")")
-        if time_series:
-            series_list_values = []
-            for timestamp, data in time_series.items():
-                series_list_values.append(data.get(parameter, None))
-            return series_list_values
-        return []
+        column = self.bars.column(parameter)
+        if column is None:
+            return np.empty(0, dtype=np.float64)
+        # reversed view, no copy; an empty column keeps its dtype
+        return column[::-1]
 
 
 
+    @metrics.instrument('analyzer.get_ticker_symbol_info', 'analyzer_calls')
     def get_ticker_symbol_info(self):
         """Get detailed price information.
 
@@ -319,7 +1861,6 @@ class PriceExtended(Price):
                   interval, open, low, high, close, volume, and historical series data if available.
         """
 
-        timestamps = self.get_timestamps()
         info = {
             'symbol': self.get_symbol(),
             'last_refreshed': self.get_last_refreshed(),
@@ -331,57 +1872,61 @@ class PriceExtended(Price):
             'volume': "{:,}".format(int(self.volume()))
         }
 
-        if timestamps:
-            info['open_series'] = self.series('1. open')
-            info['close_series'] = self.series('4. close')
-            info['volume_series'] = self.series('5. volume')
-        else:
-            info['open_series'] = []
-            info['close_series'] = []
-            info['volume_series'] = []
+        info['open_series'] = self.series(OPEN_KEY)
+        info['close_series'] = self.series(CLOSE_KEY)
+        info['volume_series'] = self.series(VOLUME_KEY)
 
         return info
 
 
 
 
-    class StockDataAnalyzer(Price):
-    def __init__(self, symbol, interval, api_key):
+class StockDataAnalyzer(Price):
+    source_extended_hours = True
+
+    def __init__(self, symbol, interval, api_key, cache=None, stream=False, lazy=False, datatype='json'):
         """Initialize a StockDataAnalyzer instance.
 
         Args:
             symbol (str): The stock symbol of interest.
             interval (int): The time interval in minutes for data retrieval.
             api_key (str): Your API key for accessing financial data.
+            cache (ResponseCache, optional): Response cache consulted before the API.
+            stream (bool, optional): Decode the response as it streams in. Default is False.
+            lazy (bool, optional): Download on first access to the data instead of now. Default is False.
+            datatype (str, optional): Response format, 'json' or 'csv'. Default is 'json'.
+        """
+
+        super().__init__(symbol, interval, api_key, extended_hours=True, cache=cache, stream=stream, lazy=lazy,
+                         datatype=datatype)
+
+    def daily_bars(self):
+        """Get the daily OHLCV table (true daily close, total volume, VWAP, bar count) of the bars.
+
+        Returns:
+            DailyBars: The daily table, aggregated once and shared by the analysis methods.
         """
 
-        super().__init__(symbol, interval, api_key, extended_hours=True)
+        return self.bars.daily()
 
+    @metrics.instrument('analyzer.find_max_volume_dates', 'analyzer_calls')
     def find_max_volume_dates(self):
         r"""Find maximum volume exchanged on given date(s) and handle tie breakers.
 
         Returns:
             tuple: A tuple containing a list of dates with maximum volume and the maximum volume value.
         """
-        timestamps = self.get_timestamps()
-        daily_volumes = {}
+        daily = self.daily_bars()
+        if not len(daily):
+            return [], None
 
-        for timestamp in timestamps:
-            date = timestamp.split()[0]
-            data = self.get_data_for_timestamp(timestamp)
-            volume = int(data["5. volume"])
+        max_volume = daily.volume.max()
+        # dates of matching max volume i.e. catch tie-breakers, newest first
+        max_volume_dates = [str(date) for date in daily.dates[daily.volume == max_volume][::-1]]
 
-            if date in daily_volumes:
-                daily_volumes[date] += volume
-            else:
-                daily_volumes[date] = volume
-
-        max_volume = max(daily_volumes.values())
-        # list comprehension to get dates of matching max volume i.e. catch tie-breakers
-        max_volume_dates = [date for date, volume in daily_volumes.items() if volume == max_volume]
-
-        return max_volume_dates, max_volume
+        return max_volume_dates, int(max_volume)
 
+    @metrics.instrument('analyzer.average_closing_price', 'analyzer_calls')
     def average_closing_price(self):
         """Calculate the average closing price for the last 'xx' days.
 
@@ -389,38 +1934,19 @@ class PriceExtended(Price):
             tuple: A tuple containing the total number of unique days and the average closing price,
                    or (None, None) if no data is available.
         """
-        timestamps = self.get_timestamps()
-
-        if not timestamps:
-            return None, None
+        daily = self.daily_bars()
 
-        today = datetime.datetime.today().date()
-        unique_days = set()
-
-        for timestamp in timestamps:
-            date = timestamp.split()[0]
-            date = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-            if date != today:
-                unique_days.add(date)
-
-        # Calculate the average closing price for unique days
-        total_closing_price = 0.0
-        total_days = len(unique_days)
-
-        for timestamp in timestamps:
-            date = timestamp.split()[0]
-            date = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-            if date in unique_days:
-                daily_stats = self.get_data_for_timestamp(timestamp)
-                if daily_stats:
-                    total_closing_price += float(daily_stats["4. close"])
-                    unique_days.remove(date)
+        # today is still trading, its close is not final
+        past_days = daily.dates != np.datetime64(datetime.datetime.today().date(), 'D')
+        total_days = int(past_days.sum())
 
         if total_days > 0:
-            return total_days, total_closing_price / total_days
+            # exact integer sum of the ticks, one division
+            return total_days, int(daily.close_ticks[past_days].sum()) / (total_days * PRICE_SCALE)
 
         return None, None
 
+    @metrics.instrument('analyzer.get_latest_closing_prices_by_date', 'analyzer_calls')
     def get_latest_closing_prices_by_date(self):
         r"""Get the latest closing price for each unique date.
 
@@ -428,27 +1954,13 @@ class PriceExtended(Price):
             dict: A dictionary containing dates as keys and the latest closing prices as values.
         """
 
-        timestamps = self.get_timestamps()
-        closing_prices_by_date = {}
-
-        for timestamp in timestamps:
-            date = timestamp.split()[0]
-
-            if date in closing_prices_by_date:
-                existing_timestamp = closing_prices_by_date[date]
-                if timestamp > existing_timestamp:
-                    closing_prices_by_date[date] = timestamp
-            else:
-                closing_prices_by_date[date] = timestamp
-
-        latest_closing_prices = {}
-        for date, latest_timestamp in closing_prices_by_date.items():
-            data = self.get_data_for_timestamp(latest_timestamp)
-            closing_price = float(data.get("4. close"))
-            latest_closing_prices[date] = closing_price
+        daily = self.daily_bars()
 
-        return latest_closing_prices
+        # newest date first, as the dates appear in the response
+        closes = daily.close.tolist()
+        return {str(daily.dates[i]): closes[i] for i in range(len(daily) - 1, -1, -1)}
 
+    @metrics.instrument('plot')
     def plot_latest_closing_prices(self):
         r"""Create a plot of the latest closing prices.
 
@@ -466,12 +1978,13 @@ class PriceExtended(Price):
         prices = list(closing_prices_by_date.values())
 
         # Create the plot
+        plt = _pyplot()
         fig, ax = plt.subplots(figsize=(12, 6))
         ax.plot(dates, prices, marker='o', linestyle='-')
         ax.set_xlabel("Date")
         ax.set_ylabel("Closing Price")
         ax.set_title(f"Latest Closing Prices for {self.get_symbol()}")
         ax.tick_params(axis='x', rotation=45)
-        plt.tight_layout()
+        fig.tight_layout()
 
         return fig  # Return the figure
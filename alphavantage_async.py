@@ -0,0 +1,344 @@
+"""
+alphavantage_async.py defines asyncio counterparts of 'Price', 'PriceExtended' and 'StockDataAnalyzer'.
+
+'AsyncPrice', 'AsyncPriceExtended' and 'AsyncStockDataAnalyzer' are built with 'await Class.create(...)' and
+download through an 'AsyncClient': one pooled aiohttp session shared by every instance of the event loop, so
+thousands of symbols can be refreshed concurrently with asyncio.gather and no thread per request. Each
+request can be given its own timeout, and cancelling the awaiting task cancels the request. Once loaded, the
+accessors and analysis methods are the ones of the blocking classes. Instances with a RequestScheduler
+(see alphavantage_scheduler.py) download through it instead, coalesced with the requests of other callers; a timeout
+or cancellation then only stops the wait, and the request is still sent for its other callers (and the cache).
+
+JSON parsing and bar construction run in a worker thread so that large responses do not stall the event loop;
+with stream=True the body is decoded chunk by chunk as it arrives instead.
+
+aiohttp is an optional dependency, imported on the first request.
+
+Usage:
+    data_analyzer = await AsyncStockDataAnalyzer.create("IBM", 30, apikey, timeout=10)
+    prices = await asyncio.gather(*(AsyncPrice.create(symbol, 5, apikey) for symbol in symbols))
+    errors = await aload_all(instruments, max_concurrency=50, timeout=10)
+"""
+
+import asyncio
+import json
+
+import AlphavantagePrice
+from AlphavantagePrice import (Price, PriceExtended, StockDataAnalyzer, BarStore, NoDataException, make_decoder,
+                               _cache_lookup, _cached_bars, _check_response)
+from alphavantage_metrics import metrics
+
+
+class AsyncClient():
+    """Pooled aiohttp session bound to the running event loop, created on the first request."""
+
+    def __init__(self, max_connections=100, timeout=30.0):
+        """Initialize an AsyncClient.
+
+        Args:
+            max_connections (int, optional): Size of the connection pool.
+            timeout (float, optional): Default total timeout of a request in seconds; None for no timeout.
+        """
+
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+        self._loop = None
+
+    def _get_session(self):
+        import aiohttp  # optional dependency, only needed by the asyncio API
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # a session cannot be shared across event loops, e.g. successive asyncio.run() calls
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
+            self._loop = loop
+        return self._session
+
+    def _request(self, params, timeout):
+        import aiohttp
+
+        timeout = self.timeout if timeout is None else timeout
+        return self._get_session().get(AlphavantagePrice.BASE_URL, params=params,
+                                       timeout=aiohttp.ClientTimeout(total=timeout))
+
+    async def get_json(self, params, cache=None, timeout=None):
+        """Send a query to the Alphavantage API and parse the JSON response.
+
+        Args:
+            params (dict): Query parameters, including the API key.
+            cache (ResponseCache, optional): Response cache consulted before the API and updated after it.
+            timeout (float, optional): Total timeout of this request in seconds. Default is the client timeout.
+
+        Returns:
+            dict: The parsed response.
+
+        Raises:
+            ThrottleException: The service answered with a rate limit "Note" or "Information" message.
+            NoDataException: The request failed, the response has no "Meta Data", or nothing is cached for an
+                offline cache.
+            asyncio.TimeoutError: The request took longer than the timeout.
+        """
+
+        import aiohttp
+
+        json_data = await asyncio.to_thread(_cache_lookup, params, cache)
+        if json_data is not None:
+            return json_data
+
+        try:
+            metrics.increment('requests')
+            with metrics.timer('fetch'):
+                async with self._request(params, timeout) as response:
+                    response.raise_for_status()  # HTTP errors?
+                    body = await response.read()
+        except aiohttp.ClientError as e:
+            raise NoDataException(f"Request failed for ticket symbol: {params.get('symbol')}: {e}") from e
+        metrics.increment('bytes_received', len(body))
+
+        def parse():
+            with metrics.timer('parse'):
+                return json.loads(body)
+
+        json_data = await asyncio.to_thread(parse)
+        _check_response(json_data, params.get('symbol'))
+
+        if cache is not None:
+            await asyncio.to_thread(cache.put, params, json_data)
+        return json_data
+
+    async def get_bars(self, params, series_key, cache=None, timeout=None):
+        """Send a query to the Alphavantage API and decode the response body as it streams in.
+
+        Args:
+            params (dict): Query parameters, including the API key.
+            series_key (str): Key of the time series section, e.g. "Time Series (30min)".
+            cache (ResponseCache, optional): Response cache consulted before the API and updated after it.
+            timeout (float, optional): Total timeout of this request in seconds. Default is the client timeout.
+
+        Returns:
+            tuple: The "Meta Data" dict and the BarStore of the response.
+
+        Raises:
+            ThrottleException: The service answered with a rate limit "Note" or "Information" message.
+            NoDataException: The request failed, the response has no "Meta Data", or nothing is cached for an
+                offline cache.
+            asyncio.TimeoutError: The request took longer than the timeout.
+        """
+
+        import aiohttp
+
+        cached = await asyncio.to_thread(_cached_bars, params, series_key, cache)
+        if cached is not None:
+            return cached
+
+        try:
+            metrics.increment('requests')
+            with metrics.timer('fetch_stream'):
+                async with self._request(params, timeout) as response:
+                    response.raise_for_status()  # HTTP errors?
+                    decoder = make_decoder(params, response.content_length or 0)
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        metrics.increment('bytes_received', len(chunk))
+                        decoder.feed(chunk)
+                metadata, bars = decoder.finish()
+        except aiohttp.ClientError as e:
+            raise NoDataException(f"Request failed for ticket symbol: {params.get('symbol')}: {e}") from e
+
+        if cache is not None:
+            await asyncio.to_thread(cache.put_bars, params, metadata, bars)
+        return metadata, bars
+
+    async def close(self):
+        """Close the pooled session; a later request opens a new one."""
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+_shared_client = None
+
+
+def shared_client():
+    """AsyncClient used by instances created without an explicit one."""
+
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncClient()
+    return _shared_client
+
+
+class AsyncPriceMixin():
+    """Awaitable loading for a Price class; the accessors are inherited unchanged.
+
+    Instances are created without data (lazy) and must be loaded with 'await aload()', which 'create' does.
+    Touching the data before that raises RuntimeError instead of blocking the event loop.
+    """
+
+    def __init__(self, *args, client=None, timeout=None, **kwargs):
+        kwargs['lazy'] = True
+        super().__init__(*args, **kwargs)
+        self.client = client
+        self.timeout = timeout
+
+    def _init_params(self, *args, **kwargs):
+        super()._init_params(*args, **kwargs)
+        self.client = None
+        self.timeout = None
+        # serializes aload() and apoll() of this instance; created on first use, inside the event loop
+        self._aload_lock = None
+
+    def _async_lock(self):
+        if self._aload_lock is None:
+            self._aload_lock = asyncio.Lock()
+        return self._aload_lock
+
+    @classmethod
+    async def create(cls, *args, timeout=None, **kwargs):
+        """Create an instance and download its data.
+
+        Args:
+            *args: Positional arguments of the blocking class (symbol, interval, API key, ...).
+            timeout (float, optional): Timeout of the requests of this instance in seconds, also when they go
+                through a scheduler (the shared download is not cancelled). Default is the client timeout.
+            **kwargs: Keyword arguments of the blocking class, plus 'client' (AsyncClient, optional).
+
+        Returns:
+            An instance of the class holding the data.
+        """
+
+        instance = cls(*args, timeout=timeout, **kwargs)
+        await instance.aload()
+        return instance
+
+    def load(self):
+        if not self._loaded:
+            raise RuntimeError(f"{type(self).__name__} for {self.symbol} is not loaded; await aload() first")
+
+    async def _afetch(self, outputsize='full', timeout=None, fresh=False):
+        client = self.client if self.client is not None else shared_client()
+        timeout = self.timeout if timeout is None else timeout
+        cache = self._request_cache(fresh)
+        params = self._query_params(outputsize)
+        if self.scheduler is not None:
+            # coalesced with the identical requests of other tasks and threads
+            streamed = self.stream or self.datatype == 'csv'
+            series_key = self._time_series_key() if streamed else None
+            kwargs = {} if self.priority is None else {'priority': self.priority}
+            request = asyncio.ensure_future(self.scheduler.afetch(params, cache, series_key=series_key, **kwargs))
+            # the outcome of a request abandoned on timeout is retrieved here, so that asyncio does not log it
+            request.add_done_callback(lambda done: done.cancelled() or done.exception())
+            # shielded: a timeout stops the wait, not the download other callers may share
+            result = await asyncio.wait_for(asyncio.shield(request), client.timeout if timeout is None else timeout)
+            if streamed:
+                return result
+            json_data = result
+        elif self.stream or self.datatype == 'csv':
+            return await client.get_bars(params, self._time_series_key(), cache, timeout)
+        else:
+            json_data = await client.get_json(params, cache, timeout)
+        return await asyncio.to_thread(
+            lambda: (json_data.get("Meta Data", {}), BarStore.from_time_series(json_data.get(self._time_series_key()))))
+
+    async def aload(self, timeout=None):
+        """Download the data now unless it is already loaded; concurrent calls share one download.
+
+        Args:
+            timeout (float, optional): Timeout of the request in seconds. Default is the instance timeout.
+        """
+
+        if self._loaded:
+            return
+        async with self._async_lock():
+            if not self._loaded:
+                self._set_data(*await self._afetch(timeout=timeout))
+
+    async def apoll(self, timeout=None, fresh=False):
+        """Awaitable counterpart of Price.poll().
+
+        Args:
+            timeout (float, optional): Timeout of each request in seconds. Default is the instance timeout.
+            fresh (bool, optional): Send the compact request (and the full one on a gap) even when the cache holds
+                a reply for it.
+
+        Returns:
+            BarStore: The bars newer than the previous last bar, preceded by that bar when its values were
+                revised. Every bar when nothing was loaded before.
+        """
+
+        async with self._async_lock():
+            if not self._loaded or not len(self._bars):
+                self._set_data(*await self._afetch(timeout=timeout))
+                return self.bars
+
+            previous = self.bars
+            if not self._merge_compact(*await self._afetch('compact', timeout, fresh)):
+                self._merge_full(*await self._afetch(timeout=timeout, fresh=fresh))
+            return self._changed_since(previous)
+
+    async def arefresh(self, timeout=None):
+        """Awaitable counterpart of Price.refresh().
+
+        Args:
+            timeout (float, optional): Timeout of each request in seconds. Default is the instance timeout.
+
+        Returns:
+            int: Number of bars added.
+        """
+
+        count = len(self._bars) if self._loaded else 0
+        await self.apoll(timeout)
+        return len(self.bars) - count
+
+
+class AsyncPrice(AsyncPriceMixin, Price):
+    """Price downloaded with asyncio: 'await AsyncPrice.create(symbol, minutes, apikey, extended_hours)'."""
+    pass
+
+
+class AsyncPriceExtended(AsyncPriceMixin, PriceExtended):
+    """PriceExtended downloaded with asyncio: 'await AsyncPriceExtended.create(symbol, interval, api_key)'."""
+    pass
+
+
+class AsyncStockDataAnalyzer(AsyncPriceMixin, StockDataAnalyzer):
+    """StockDataAnalyzer downloaded with asyncio: 'await AsyncStockDataAnalyzer.create(symbol, interval, api_key)'."""
+    pass
+
+
+async def aload_all(instruments, max_concurrency=100, timeout=None):
+    """Load many async instances concurrently.
+
+    Args:
+        instruments (list): AsyncPrice, AsyncPriceExtended or AsyncStockDataAnalyzer instances; loaded ones are
+            skipped.
+        max_concurrency (int, optional): Maximum number of requests in flight.
+        timeout (float, optional): Timeout of each request in seconds. Default is the instance timeout.
+
+    Returns:
+        dict: Instrument to the exception of each instrument that failed to load (empty when all loaded).
+    """
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def load(instrument):
+        async with semaphore:
+            await instrument.aload(timeout)
+
+    pending = [instrument for instrument in instruments if not instrument.is_loaded()]
+    results = await asyncio.gather(*(load(instrument) for instrument in pending), return_exceptions=True)
+    errors = {}
+    for instrument, result in zip(pending, results):
+        if isinstance(result, (NoDataException, asyncio.TimeoutError)):
+            errors[instrument] = result
+        elif isinstance(result, BaseException):
+            raise result
+    return errors
@@ -0,0 +1,184 @@
+"""
+alphavantage_backfill.py builds deep intraday history in a local archive partitioned by (symbol, interval, month).
+
+TIME_SERIES_INTRADAY only returns a rolling window of recent bars, unless the 'month=YYYY-MM' parameter asks
+for one past month. 'Backfill' requests many months of many symbols concurrently under the shared
+RateLimiter, and writes each month to its own compressed columnar .npz partition of a 'BarArchive'.
+Partitions already present are skipped, so an interrupted backfill resumes where it stopped; the current
+month is always fetched again since it is still growing, and months after it are never requested.
+
+Layout: <directory>/<SYMBOL>/<interval>_<session>/<YYYY-MM>.npz
+
+Usage:
+    archive = BarArchive('history')
+    Backfill(archive, apikey, limiter=RateLimiter(*PREMIUM_75)).run(["IBM", "MSFT"], 1, "2022-01", "2023-12")
+    data_analyzer = StockDataAnalyzer.from_archive(archive, "IBM", 1, "2023-03-01", "2023-06-30")
+"""
+
+import datetime
+import os
+
+import numpy as np
+
+from AlphavantagePrice import Price, BarStore, to_datetime64
+from alphavantage_fetch import RateLimiter, FREE_TIER, run_requests, pooled_session
+from alphavantage_scheduler import BATCH
+
+
+def months_between(first, last):
+    """List the months from 'first' to 'last', both included.
+
+    Args:
+        first (str): First month as 'YYYY-MM'.
+        last (str): Last month as 'YYYY-MM'.
+
+    Returns:
+        list: Months as 'YYYY-MM' strings in ascending order.
+    """
+
+    months = np.arange(np.datetime64(first, 'M'), np.datetime64(last, 'M') + 1)
+    return [str(month) for month in months]
+
+
+class BarArchive():
+    """Directory of monthly bar partitions."""
+
+    def __init__(self, directory):
+        """Initialize a BarArchive.
+
+        Args:
+            directory (str): Root directory of the archive, created if missing.
+        """
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def partition_path(self, symbol, minutes, month, extended_hours=True):
+        """Path of the partition file of one (symbol, interval, month)."""
+
+        session = 'extended' if extended_hours else 'regular'
+        return os.path.join(self.directory, symbol.upper(), f'{minutes}min_{session}', f'{month}.npz')
+
+    def has_partition(self, symbol, minutes, month, extended_hours=True):
+        """Whether the partition of one (symbol, interval, month) has been written."""
+
+        return os.path.exists(self.partition_path(symbol, minutes, month, extended_hours))
+
+    def write_partition(self, symbol, minutes, month, bars, metadata=None, extended_hours=True):
+        """Write the bars of one month to its partition, atomically."""
+
+        path = self.partition_path(symbol, minutes, month, extended_hours)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        bars.save(path, metadata, compressed=True)
+
+    def months(self, symbol, minutes, extended_hours=True):
+        """List the months archived for a symbol and interval, ascending."""
+
+        directory = os.path.dirname(self.partition_path(symbol, minutes, '0000-00', extended_hours))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.npz'))
+
+    def load_bars(self, symbol, minutes, start=None, end=None, extended_hours=True):
+        """Load the bars within [start, end], reading only the partitions of the months in that range.
+
+        Args:
+            symbol (str): The stock symbol.
+            minutes (int): The time interval in minutes.
+            start (str or datetime.datetime, optional): First timestamp included. Default is the oldest bar.
+            end (str or datetime.datetime, optional): Last timestamp included. Default is the newest bar.
+            extended_hours (bool, optional): Session of the archived bars. Default is True.
+
+        Returns:
+            BarStore: The bars of the range in ascending time order.
+        """
+
+        first_month = str(np.datetime64(to_datetime64(start), 'M')) if start is not None else None
+        last_month = str(np.datetime64(to_datetime64(end), 'M')) if end is not None else None
+
+        partitions = [BarStore.load(self.partition_path(symbol, minutes, month, extended_hours))[0]
+                      for month in self.months(symbol, minutes, extended_hours)
+                      if not (first_month and month < first_month) and not (last_month and month > last_month)]
+        if not partitions:
+            return BarStore.empty()
+        # months are disjoint and listed in ascending order: concatenate the columns once, no merge or sort
+        columns = [np.concatenate([getattr(partition, name) for partition in partitions])
+                   for name in ('timestamps', 'open_ticks', 'high_ticks', 'low_ticks', 'close_ticks', 'volume')]
+        return BarStore.from_ticks(*columns).between(start, end)
+
+
+class Backfill():
+    """Concurrent, resumable download of monthly intraday history into a BarArchive."""
+
+    def __init__(self, archive, apikey, limiter=None, cache=None, max_workers=4, max_retries=5, backoff=2.0,
+                 scheduler=None):
+        """Initialize a Backfill.
+
+        Args:
+            archive (BarArchive): Destination archive.
+            apikey (str): Your API key for accessing financial data.
+            limiter (RateLimiter, optional): Shared rate limiter, acquired for requests not served from the cache.
+                Default is the free tier quota. Not used with a scheduler.
+            cache (ResponseCache, optional): Response cache consulted before the API.
+            max_workers (int, optional): Number of concurrent downloads.
+            max_retries (int, optional): Retries of a month after throttling replies before giving up.
+            backoff (float, optional): Delay in seconds before the first retry, doubled on every further retry.
+            scheduler (RequestScheduler, optional): Send the requests through this scheduler at BATCH priority,
+                behind interactive requests; the scheduler's limiter then does the rate limiting.
+                Default is Price.default_scheduler.
+        """
+
+        self.archive = archive
+        self.apikey = apikey
+        if scheduler is None:
+            scheduler = Price.default_scheduler
+        self.scheduler = scheduler
+        if scheduler is not None:
+            limiter = None  # the scheduler's own limiter applies to its requests
+        elif limiter is None:
+            limiter = RateLimiter(*FREE_TIER)
+        self.limiter = limiter
+        self.cache = cache
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def missing(self, symbols, minutes, first_month, last_month, extended_hours=True):
+        """List the (symbol, month) partitions still to download; the current month always is, later ones never."""
+
+        current_month = datetime.date.today().strftime('%Y-%m')
+        return [(symbol.upper(), month)
+                for symbol in symbols
+                for month in months_between(first_month, min(last_month, current_month))
+                if month == current_month or not self.archive.has_partition(symbol, minutes, month, extended_hours)]
+
+    def run(self, symbols, minutes, first_month, last_month, extended_hours=True):
+        """Download the missing monthly partitions of the symbols.
+
+        Args:
+            symbols (list): Stock symbols of interest.
+            minutes (int): The time interval in minutes.
+            first_month (str): First month as 'YYYY-MM'.
+            last_month (str): Last month as 'YYYY-MM'.
+            extended_hours (bool, optional): Whether to include extended hours bars. Default is True.
+
+        Returns:
+            tuple: A dict of (symbol, month) to the number of bars written, and a dict of (symbol, month)
+                to the exception of failed partitions.
+        """
+
+        session = pooled_session(self.max_workers) if self.scheduler is None else None
+
+        def fetch(task):
+            symbol, month = task
+            price = Price.for_month(symbol, minutes, month, self.apikey, extended_hours, self.cache, session,
+                                    self.limiter, self.scheduler, BATCH)
+            self.archive.write_partition(symbol, minutes, month, price.bars, price.get_metadata(), extended_hours)
+            return len(price.bars)
+
+        tasks = self.missing(symbols, minutes, first_month, last_month, extended_hours)
+        try:
+            return run_requests(tasks, fetch, self.limiter, self.max_workers, self.max_retries, self.backoff)
+        finally:
+            if session is not None:
+                session.close()
@@ -0,0 +1,433 @@
+"""
+alphavantage_benchmark.py measures the performance of the AlphavantagePrice module without the real API.
+
+A local stand-in server answers '/query' the way the Alphavantage service does: it replays 'alphavantage.json'
+for its symbol and interval, and generates synthetic TIME_SERIES_INTRADAY payloads of any size, interval and
+session for every other symbol, as JSON or as CSV (datatype=csv). The harness points the module at the stand-in
+server, times Price construction (JSON, streamed JSON and CSV, with the size of each body on the wire),
+get_ticker_symbol_info, every StockDataAnalyzer method and plot_latest_closing_prices, tracks peak memory with
+tracemalloc, and writes a JSON report that can be compared across versions.
+
+It also times a cold 'import AlphavantagePrice' in fresh interpreters and checks that it loads neither
+matplotlib nor requests; with --max-import-seconds the run fails when the import regresses.
+
+Usage: python alphavantage_benchmark.py [--sizes 1000 10000 100000 500000] [--intervals 1 5 15 30 60]
+                                       [--sessions regular extended] [--symbols 8] [--repeat 3]
+                                       [--max-import-seconds 0.5] [--output benchmark_report.json]
+"""
+
+import argparse
+import datetime
+import http.server
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.parse
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np  # noqa: E402
+
+import AlphavantagePrice  # noqa: E402
+from AlphavantagePrice import Price, PriceExtended, StockDataAnalyzer, BarStore  # noqa: E402
+from alphavantage_fetch import RateLimiter, fetch_many  # noqa: E402
+from alphavantage_portfolio import PortfolioAnalyzer  # noqa: E402
+
+FIXTURE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alphavantage.json')
+# last trading day of the synthetic payloads, so reports are reproducible
+SYNTHETIC_END_DATE = '2023-11-03'
+SYNTHETIC_BARS_PER_SYMBOL = 10000
+# modules that must stay out of 'import AlphavantagePrice', they are loaded when plotting / downloading
+DEFERRED_MODULES = ('matplotlib', 'requests')
+
+
+def synthetic_payload(symbol, minutes, count, extended_hours=False, seed=0):
+    """Generate a TIME_SERIES_INTRADAY JSON body in the format of the service.
+
+    Bars cover the trading sessions of the weekdays before SYNTHETIC_END_DATE (04:00-20:00 with extended hours,
+    09:30-16:00 without), newest first, with a random walk of prices.
+
+    Args:
+        symbol (str): The stock symbol.
+        minutes (int): The time interval in minutes.
+        count (int): Number of bars.
+        extended_hours (bool, optional): Whether to cover the extended hours session. Default is False.
+        seed (int, optional): Seed of the random walk. Default is 0.
+
+    Returns:
+        bytes: The JSON body.
+    """
+
+    start, end = (4 * 60, 20 * 60) if extended_hours else (9 * 60 + 30, 16 * 60)
+    slots = np.arange(start, end, minutes)
+    day_count = -(-count // len(slots))
+    days = np.busday_offset(SYNTHETIC_END_DATE, -np.arange(day_count)[::-1], roll='backward')
+    timestamps = (days.astype('datetime64[m]')[:, None] + slots.astype('timedelta64[m]')).ravel()[-count:]
+
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, count)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + np.abs(rng.normal(0.0, 0.02, count))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0.0, 0.02, count))
+    volume = rng.integers(1, 1000000, count)
+
+    timestamp_strs = np.datetime_as_string(timestamps, unit='s')
+    columns = [np.char.mod('%.4f', column) for column in (open_, high, low, close)]
+    bars = [
+        f'        "{timestamp_strs[i].replace("T", " ")}": {{\n'
+        f'            "1. open": "{columns[0][i]}",\n'
+        f'            "2. high": "{columns[1][i]}",\n'
+        f'            "3. low": "{columns[2][i]}",\n'
+        f'            "4. close": "{columns[3][i]}",\n'
+        f'            "5. volume": "{volume[i]}"\n'
+        f'        }}'
+        for i in range(count - 1, -1, -1)
+    ]
+    interval = f'{minutes}min'
+    metadata = {
+        "1. Information": f"Intraday ({interval}) open, high, low, close prices and volume",
+        "2. Symbol": symbol,
+        "3. Last Refreshed": str(timestamp_strs[-1]).replace('T', ' '),
+        "4. Interval": interval,
+        "5. Output Size": "Full size",
+        "6. Time Zone": "US/Eastern",
+    }
+    head = '{\n    "Meta Data": ' + json.dumps(metadata, indent=8) + f',\n    "Time Series ({interval})": {{\n'
+    return (head + ',\n'.join(bars) + '\n    }\n}').encode('utf-8')
+
+
+def csv_payload(body):
+    """Convert a TIME_SERIES_INTRADAY JSON body into the datatype=csv body of the same bars.
+
+    Args:
+        body (bytes): The JSON body; error messages are returned unchanged, as the service does.
+
+    Returns:
+        bytes: The CSV body, newest bar first.
+    """
+
+    json_data = json.loads(body)
+    series_key = next((key for key in json_data if key.startswith('Time Series')), None)
+    if series_key is None:
+        return body
+    lines = ['timestamp,open,high,low,close,volume']
+    lines.extend(f'{timestamp},' + ','.join(bar.values()) for timestamp, bar in json_data[series_key].items())
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+class StubServer():
+    """Local stand-in for the Alphavantage '/query' endpoint, running in a background thread.
+
+    The fixture symbol and interval are replayed from 'alphavantage.json'; other symbols get a synthetic payload
+    of 'bars' bars (per symbol through 'bars_per_symbol'). Requests with datatype=csv get the same bars as CSV.
+    Payloads are generated once and kept in memory.
+    """
+
+    def __init__(self, bars=SYNTHETIC_BARS_PER_SYMBOL, bars_per_symbol=None, fixture=FIXTURE_FILE):
+        """Initialize a StubServer; call start() to serve.
+
+        Args:
+            bars (int, optional): Number of bars of synthetic payloads.
+            bars_per_symbol (dict, optional): Number of bars of synthetic payloads per symbol.
+            fixture (str, optional): Response replayed for its own symbol and interval.
+        """
+
+        self.bars = bars
+        self.bars_per_symbol = dict(bars_per_symbol or {})
+        self.requests = 0
+        self._payloads = {}
+        self._lock = threading.Lock()
+        with open(fixture, 'rb') as f:
+            self._fixture_body = f.read()
+        metadata = json.loads(self._fixture_body)["Meta Data"]
+        self._fixture_key = (metadata["2. Symbol"], metadata["4. Interval"])
+        self._server = None
+
+    def payload(self, params):
+        """Body of the response to the query parameters 'params'."""
+
+        if params.get('datatype') == 'csv':
+            key = tuple(sorted(params.items()))
+            with self._lock:
+                body = self._payloads.get(key)
+            if body is None:
+                body = csv_payload(self.payload(dict(params, datatype='json')))
+                with self._lock:
+                    self._payloads[key] = body
+            return body
+
+        symbol = params.get('symbol', '')
+        interval = params.get('interval', '')
+        if (symbol, interval) == self._fixture_key:
+            return self._fixture_body
+        if not interval.endswith('min') or not symbol:
+            return json.dumps({"Error Message": "Invalid API call."}).encode('utf-8')
+
+        extended_hours = params.get('extended_hours', 'true') == 'true'
+        count = self.bars_per_symbol.get(symbol, self.bars)
+        key = (symbol, interval, extended_hours, count)
+        with self._lock:
+            if key not in self._payloads:
+                seed = sum(symbol.encode('utf-8'))
+                self._payloads[key] = synthetic_payload(symbol, int(interval[:-3]), count, extended_hours, seed)
+            return self._payloads[key]
+
+    def start(self):
+        """Start serving on a free local port.
+
+        Returns:
+            str: URL of the '/query' endpoint.
+        """
+
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                if url.path != '/query':
+                    self.send_error(404)
+                    return
+                params = dict(urllib.parse.parse_qsl(url.query))
+                body = stub.payload(params)
+                with stub._lock:
+                    stub.requests += 1
+                self.send_response(200)
+                csv = params.get('datatype') == 'csv' and not body.startswith(b'{')
+                self.send_header('Content-Type', 'text/csv' if csv else 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_address[1]}/query'
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def measure(operation, repeat=3):
+    """Time an operation and track its peak memory.
+
+    Args:
+        operation (callable): Called without arguments; a fresh setup belongs inside it.
+        repeat (int, optional): Number of timed runs. Default is 3.
+
+    Returns:
+        dict: 'min_seconds', 'median_seconds' and 'peak_bytes' (tracemalloc peak of one extra run).
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'min_seconds': min(timings), 'median_seconds': statistics.median(timings), 'peak_bytes': peak}
+
+
+def measure_import(module='AlphavantagePrice', repeat=5):
+    """Time a cold import of 'module' in fresh interpreters.
+
+    Args:
+        module (str, optional): Module to import. Default is 'AlphavantagePrice'.
+        repeat (int, optional): Number of interpreters started. Default is 5.
+
+    Returns:
+        dict: 'min_seconds', 'median_seconds' and 'deferred_modules_loaded' (DEFERRED_MODULES the import loaded).
+    """
+
+    code = ('import json, sys, time\n'
+            'start = time.perf_counter()\n'
+            f'import {module}\n'
+            'seconds = time.perf_counter() - start\n'
+            f'loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]\n'
+            'print(json.dumps({"seconds": seconds, "loaded": loaded}))\n')
+    directory = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=directory, capture_output=True, text=True,
+                                check=True).stdout
+        result = json.loads(output)
+        timings.append(result['seconds'])
+        loaded.update(result['loaded'])
+
+    return {'min_seconds': min(timings), 'median_seconds': statistics.median(timings),
+            'deferred_modules_loaded': sorted(loaded)}
+
+
+def wire_sizes(stub, symbol, minutes, extended_hours):
+    """Sizes in bytes of the JSON and the CSV response of one full size request to the stand-in server."""
+
+    params = {'function': 'TIME_SERIES_INTRADAY', 'symbol': symbol, 'interval': f'{minutes}min',
+              'extended_hours': 'true' if extended_hours else 'false', 'outputsize': 'full'}
+    return {'json_bytes': len(stub.payload(params)), 'csv_bytes': len(stub.payload(dict(params, datatype='csv')))}
+
+
+def _fresh_analyzer(analyzer):
+    # a new BarStore on the same columns, so cached aggregates are computed again
+    bars = analyzer.bars
+    fresh_bars = BarStore.from_ticks(bars.timestamps, bars.open_ticks, bars.high_ticks, bars.low_ticks,
+                                     bars.close_ticks, bars.volume)
+    return StockDataAnalyzer.from_bars(analyzer.symbol, int(analyzer.interval_mins[:-3]), fresh_bars,
+                                       analyzer.get_metadata())
+
+
+def _plot(analyzer):
+    import matplotlib.pyplot as plt
+
+    fig = analyzer.plot_latest_closing_prices()
+    if fig is not None:
+        plt.close(fig)
+
+
+def benchmark_symbol(symbol, minutes, extended_hours, repeat=3):
+    """Benchmark every operation on one symbol served by the stand-in server.
+
+    Returns:
+        dict: Operation name to its measure() result.
+    """
+
+    results = {
+        'Price': measure(lambda: Price(symbol, minutes, 'bench', extended_hours=extended_hours), repeat),
+        'Price(stream=True)': measure(
+            lambda: Price(symbol, minutes, 'bench', extended_hours=extended_hours, stream=True), repeat),
+        'Price(datatype=csv)': measure(
+            lambda: Price(symbol, minutes, 'bench', extended_hours=extended_hours, datatype='csv'), repeat),
+    }
+
+    extended = PriceExtended(symbol, minutes, 'bench')
+    results['get_ticker_symbol_info'] = measure(extended.get_ticker_symbol_info, repeat)
+
+    analyzer = StockDataAnalyzer(symbol, minutes, 'bench')
+    for method in ('find_max_volume_dates', 'average_closing_price', 'get_latest_closing_prices_by_date'):
+        results[method] = measure(lambda: getattr(_fresh_analyzer(analyzer), method)(), repeat)
+    results['plot_latest_closing_prices'] = measure(lambda: _plot(_fresh_analyzer(analyzer)), repeat)
+    return results
+
+
+def run(sizes, intervals, sessions, symbols=0, repeat=3):
+    """Run the benchmark grid against a stand-in server.
+
+    Args:
+        sizes (list): Numbers of bars of the synthetic payloads.
+        intervals (list): Intervals in minutes.
+        sessions (list): 'regular' and/or 'extended'.
+        symbols (int, optional): Number of symbols of the multi-symbol fetch_many and PortfolioAnalyzer
+            scenario; 0 skips it.
+        repeat (int, optional): Timed runs per operation.
+
+    Returns:
+        dict: The report: environment and one entry per scenario and operation.
+    """
+
+    stub = StubServer()
+    base_url = AlphavantagePrice.BASE_URL
+    AlphavantagePrice.BASE_URL = stub.start()
+    results = [dict({'name': 'import', 'operation': 'import AlphavantagePrice'}, **measure_import(repeat=repeat))]
+    try:
+        with open(FIXTURE_FILE, 'r', encoding='utf-8') as f:
+            fixture_metadata = json.load(f)["Meta Data"]
+        scenario = {'name': 'fixture', 'symbol': fixture_metadata["2. Symbol"],
+                    'minutes': int(fixture_metadata["4. Interval"][:-3]), 'extended_hours': True}
+        for operation, measured in benchmark_symbol(scenario['symbol'], scenario['minutes'], True, repeat).items():
+            results.append(dict(scenario, operation=operation, **measured))
+
+        for size in sizes:
+            for minutes in intervals:
+                for session in sessions:
+                    symbol = f'SYN{size}'
+                    stub.bars_per_symbol[symbol] = size
+                    extended_hours = session == 'extended'
+                    scenario = {'name': f'synthetic_{size}_{minutes}min_{session}', 'symbol': symbol,
+                                'minutes': minutes, 'extended_hours': extended_hours, 'bars': size}
+                    scenario.update(wire_sizes(stub, symbol, minutes, extended_hours))
+                    for operation, measured in benchmark_symbol(symbol, minutes, extended_hours, repeat).items():
+                        results.append(dict(scenario, operation=operation, **measured))
+
+        if symbols:
+            names = [f'MULTI{i}' for i in range(symbols)]
+            limiter = RateLimiter(1000000)
+            scenario = {'name': f'fetch_many_{symbols}_symbols', 'symbols': symbols, 'minutes': intervals[0],
+                        'extended_hours': True, 'bars': SYNTHETIC_BARS_PER_SYMBOL}
+            measured = measure(lambda: fetch_many(names, intervals[0], 'bench', limiter=limiter, max_workers=8),
+                               repeat)
+            results.append(dict(scenario, operation='fetch_many', **measured))
+
+            sources, _ = fetch_many(names, intervals[0], 'bench', limiter=limiter, max_workers=8)
+            portfolio = PortfolioAnalyzer.from_sources(sources)
+            results.append(dict(scenario, operation='PortfolioAnalyzer.from_sources',
+                                **measure(lambda: PortfolioAnalyzer.from_sources(sources), repeat)))
+            for operation, method in (('top_movers', lambda p: p.top_movers(10)),
+                                      ('correlation', lambda p: p.correlation()),
+                                      ('relative_volume', lambda p: p.relative_volume())):
+                measured = measure(lambda: method(portfolio), repeat)
+                results.append(dict(scenario, operation=f'PortfolioAnalyzer.{operation}', **measured))
+    finally:
+        stub.stop()
+        AlphavantagePrice.BASE_URL = base_url
+
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark AlphavantagePrice against a local stand-in server.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='numbers of bars of the synthetic payloads (up to 500000)')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[1, 5, 15, 30, 60], help='intervals in minutes')
+    parser.add_argument('--sessions', nargs='+', choices=['regular', 'extended'], default=['regular', 'extended'])
+    parser.add_argument('--symbols', type=int, default=8, help='symbols of the fetch_many scenario, 0 to skip')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per operation')
+    parser.add_argument('--max-import-seconds', type=float, default=None,
+                        help='fail when importing AlphavantagePrice takes longer or loads matplotlib/requests')
+    parser.add_argument('--output', default='benchmark_report.json', help='JSON report file')
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.intervals, args.sessions, args.symbols, args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for result in report['results']:
+        memory = f"{result['peak_bytes'] / 1024:12,.0f} KiB" if 'peak_bytes' in result else ''
+        print(f"{result['name']:<40} {result['operation']:<36} {result['min_seconds'] * 1000:10.2f} ms {memory}")
+    print(f"Report saved as {args.output}")
+
+    if args.max_import_seconds is not None:
+        import_result = report['results'][0]
+        loaded = import_result['deferred_modules_loaded']
+        if loaded:
+            sys.exit(f"Import regression: AlphavantagePrice loads {', '.join(loaded)}")
+        if import_result['median_seconds'] > args.max_import_seconds:
+            sys.exit(f"Import regression: {import_result['median_seconds']:.3f} s > {args.max_import_seconds} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+alphavantage_cache.py defines 'ResponseCache', a persistent on-disk cache of Alphavantage responses.
+
+Responses are keyed on (function, symbol, interval, extended_hours, outputsize, month); the API key is never part
+of the key. Each entry is one JSON file written atomically (temporary file + os.replace), so a crashed writer
+never leaves a half written entry behind. Streamed responses are stored as their bar columns instead (a BarStore
+.npz file), so that neither storing nor reading them builds a dict per bar. Entries expire after a TTL that
+defaults to the bar interval, and the least recently used entries are evicted once the cache grows past its
+entry or byte limits.
+
+In offline mode the cache never expires entries and, when nothing is cached for a request, falls back to
+fixture files such as the bundled 'alphavantage.json'.
+
+Usage:
+    cache = ResponseCache('.alphavantage_cache')
+    ticker_symbol = Price("IBM", 30, apikey, cache=cache)
+
+    offline = ResponseCache('.alphavantage_cache', offline=True, fixtures=['alphavantage.json'])
+    ticker_symbol = Price("IBM", 30, apikey, cache=offline)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# TTL of responses whose interval is not in minutes (e.g. daily series)
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+def interval_seconds(interval):
+    """Length of a bar interval in seconds.
+
+    Args:
+        interval (str): Interval as used by the API, e.g. "30min".
+
+    Returns:
+        int or None: The interval in seconds, or None if it is not an intraday interval.
+    """
+
+    if interval and interval.endswith('min') and interval[:-3].isdigit():
+        return int(interval[:-3]) * 60
+    return None
+
+
+class ResponseCache():
+    """Size-bounded LRU cache of parsed API responses stored as JSON (or bar column) files in one directory."""
+
+    def __init__(self, directory, ttl=None, max_entries=512, max_bytes=512 * 1024 * 1024, offline=False,
+                 fixtures=None):
+        """Initialize a ResponseCache.
+
+        Args:
+            directory (str): Directory holding the cache entries, created if missing.
+            ttl (int or dict, optional): Time to live in seconds, either one value for every entry or a dict
+                keyed by interval (e.g. {"1min": 60}). Default is the length of the bar interval.
+            max_entries (int, optional): Maximum number of entries kept on disk.
+            max_bytes (int, optional): Maximum total size of the entries kept on disk.
+            offline (bool, optional): Serve entries regardless of age and never go to the network.
+            fixtures (list, optional): Paths of response files served in offline mode when nothing is cached.
+        """
+
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.fixtures = list(fixtures or [])
+        self._fixture_index = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(params):
+        """Build the cache key of a request.
+
+        Args:
+            params (dict): Query parameters of the request.
+
+        Returns:
+            tuple: (function, symbol, interval, extended_hours, outputsize, month).
+        """
+
+        return (params.get('function'), str(params.get('symbol', '')).upper(), params.get('interval'),
+                params.get('extended_hours'), params.get('outputsize'), params.get('month'))
+
+    def ttl_for(self, interval):
+        """Time to live in seconds of responses for the given interval."""
+
+        if isinstance(self.ttl, dict):
+            if interval in self.ttl:
+                return self.ttl[interval]
+        elif self.ttl is not None:
+            return self.ttl
+        return interval_seconds(interval) or DEFAULT_TTL_SECONDS
+
+    def _path(self, key, suffix='.json'):
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + suffix)
+
+    def _fresh(self, entry, key, path):
+        """Whether a stored entry answers 'key'; a fresh entry is touched so it is the most recently used."""
+
+        if entry is None or tuple(entry.get('key', ())) != key:
+            return False
+        age = time.time() - entry.get('stored_at', 0)
+        if not self.offline and age >= self.ttl_for(key[2]):
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def get(self, params):
+        """Look up the response of a request.
+
+        Args:
+            params (dict): Query parameters of the request.
+
+        Returns:
+            dict or None: The cached response, or None on a miss or an expired entry.
+        """
+
+        key = self.make_key(params)
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if self._fresh(entry, key, path):
+            return entry['data']
+
+        if self.offline:
+            return self._fixture(key)
+        return None
+
+    def put(self, params, json_data):
+        """Store the response of a request, then evict the least recently used entries over the limits.
+
+        Args:
+            params (dict): Query parameters of the request.
+            json_data (dict): The parsed response.
+        """
+
+        key = self.make_key(params)
+        entry = {'key': list(key), 'stored_at': time.time(), 'data': json_data}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def get_bars(self, params):
+        """Look up the bars of a request stored by put_bars().
+
+        Args:
+            params (dict): Query parameters of the request.
+
+        Returns:
+            tuple or None: The "Meta Data" dict and the BarStore, or None on a miss or an expired entry. Responses
+                stored by put() and fixtures are not looked up.
+        """
+
+        from AlphavantagePrice import BarStore  # deferred: AlphavantagePrice does not import this module
+
+        key = self.make_key(params)
+        path = self._path(key, '.npz')
+        try:
+            bars, entry = BarStore.load(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if not self._fresh(entry, key, path):
+            return None
+        return entry.get('data', {}), bars
+
+    def put_bars(self, params, metadata, bars):
+        """Store the bars of a request as columns, then evict the least recently used entries over the limits.
+
+        Args:
+            params (dict): Query parameters of the request.
+            metadata (dict): The "Meta Data" of the response.
+            bars (BarStore): The bars of the response.
+        """
+
+        key = self.make_key(params)
+        bars.save(self._path(key, '.npz'), {'key': list(key), 'stored_at': time.time(), 'data': metadata})
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(('.json', '.npz')):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total_bytes -= size
+
+    def clear(self):
+        """Remove every entry of the cache."""
+
+        for _, _, name in self._entries():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _fixture(self, key):
+        """Find a fixture file matching the symbol and interval of 'key' and return its response."""
+
+        if self._fixture_index is None:
+            self._fixture_index = {}
+            for path in self.fixtures:
+                with open(path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f).get("Meta Data", {})
+                fixture_key = (str(metadata.get("2. Symbol", '')).upper(), metadata.get("4. Interval"))
+                self._fixture_index.setdefault(fixture_key, path)
+
+        path = self._fixture_index.get((key[1], key[2]))
+        if path is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
@@ -0,0 +1,201 @@
+"""
+alphavantage_fetch.py downloads the intraday series of a watch list of symbols concurrently.
+
+Requests go through one pooled 'requests.Session' and a token bucket 'RateLimiter' that respects the
+per-minute and per-day quota of the API key tier. When the service answers with a throttling "Note" or
+"Information" message instead of data, the symbol is put back in the queue and retried after an
+exponential backoff instead of failing.
+
+Usage:
+    sources, errors = fetch_many(["IBM", "MSFT", "AAPL"], 30, apikey, limiter=RateLimiter(*PREMIUM_75))
+    data_analyzer = StockDataAnalyzer.from_source(sources["IBM"])
+"""
+
+import concurrent.futures
+import heapq
+import random
+import threading
+import time
+
+import requests
+
+from AlphavantagePrice import PriceSource, ThrottleException
+
+# (requests per minute, requests per day) of the Alphavantage key tiers
+FREE_TIER = (5, 25)
+PREMIUM_75 = (75, None)
+PREMIUM_150 = (150, None)
+PREMIUM_300 = (300, None)
+PREMIUM_600 = (600, None)
+PREMIUM_1200 = (1200, None)
+
+
+class QuotaExceededException(Exception):
+    """The per-day request quota of the API key is used up."""
+    pass
+
+
+class RateLimiter():
+    """Thread-safe token bucket limiting requests per minute, with an optional per-day budget."""
+
+    def __init__(self, per_minute, per_day=None):
+        """Initialize a RateLimiter.
+
+        Args:
+            per_minute (int): Requests allowed per minute; also the burst size of the bucket.
+            per_day (int, optional): Requests allowed per rolling 24 hours. Default is no daily limit.
+        """
+
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._tokens = float(per_minute)
+        self._refill_rate = per_minute / 60.0
+        self._updated = time.monotonic()
+        self._day_start = self._updated
+        self._day_count = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(float(self.per_minute), self._tokens + (now - self._updated) * self._refill_rate)
+        self._updated = now
+        if now - self._day_start >= 24 * 60 * 60:
+            self._day_start = now
+            self._day_count = 0
+
+    def acquire(self):
+        """Block until a request may be sent, then take one token.
+
+        Raises:
+            QuotaExceededException: The per-day budget is used up.
+        """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.per_day is not None and self._day_count >= self.per_day:
+                    raise QuotaExceededException(f"Daily quota of {self.per_day} requests used up")
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._day_count += 1
+                    return
+                wait = (1.0 - self._tokens) / self._refill_rate
+            time.sleep(wait)
+
+    def drain(self):
+        """Empty the bucket, e.g. after a throttling reply showed the service counts more requests than we did."""
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+
+def run_requests(tasks, worker, limiter, max_workers=4, max_retries=5, backoff=2.0):
+    """Run rate limited request tasks on a thread pool, requeueing throttled tasks with exponential backoff.
+
+    The worker takes its tokens from 'limiter' right before each HTTP request it sends (e.g. through the
+    'limiter' argument of download_json() or Price.limiter), so tasks served from the cache cost none.
+
+    Args:
+        tasks (list): Hashable task descriptions, e.g. symbols.
+        worker (callable): Called as worker(task); returns the result.
+        limiter (RateLimiter): Shared rate limiter of the worker's requests, drained after a throttling reply;
+            None when the worker is rate limited elsewhere (e.g. by a RequestScheduler).
+        max_workers (int, optional): Number of concurrent requests.
+        max_retries (int, optional): Retries of a task after throttling replies before giving up.
+        backoff (float, optional): Delay in seconds before the first retry, doubled on every further retry.
+
+    Returns:
+        tuple: A dict of task to result, and a dict of task to the exception of failed tasks (any exception
+            the worker raised, once the retries of throttled tasks are used up).
+    """
+
+    results = {}
+    errors = {}
+    # (ready time, order, task, attempt) of tasks waiting to be (re)submitted
+    pending = [(0.0, i, task, 0) for i, task in enumerate(dict.fromkeys(tasks))]
+    heapq.heapify(pending)
+    order = len(pending)
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            now = time.monotonic()
+            while pending and pending[0][0] <= now and len(running) < max_workers:
+                _, _, task, attempt = heapq.heappop(pending)
+                running[executor.submit(worker, task)] = (task, attempt)
+
+            timeout = max(0.0, pending[0][0] - now) if pending else None
+            if not running:
+                time.sleep(timeout)
+                continue
+            done, _ = concurrent.futures.wait(running, timeout=timeout,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task, attempt = running.pop(future)
+                try:
+                    results[task] = future.result()
+                except ThrottleException as e:
+                    if limiter is not None:
+                        limiter.drain()
+                    if attempt >= max_retries:
+                        errors[task] = e
+                    else:
+                        delay = backoff * 2 ** attempt * (1.0 + random.random() * 0.1)
+                        heapq.heappush(pending, (time.monotonic() + delay, order, task, attempt + 1))
+                        order += 1
+                except Exception as e:
+                    # e.g. NoDataException, QuotaExceededException or a decoding error: only this task fails
+                    errors[task] = e
+
+    return results, errors
+
+
+def pooled_session(max_workers):
+    """Create a requests.Session keeping up to 'max_workers' connections open."""
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_many(symbols, minutes, apikey, cache=None, limiter=None, max_workers=4, max_retries=5, backoff=2.0,
+               session=None, datatype='json'):
+    """Download the extended hours series of many symbols concurrently.
+
+    Args:
+        symbols (list): Stock symbols of interest.
+        minutes (int): The time interval in minutes for data retrieval.
+        apikey (str): Your API key for accessing financial data.
+        cache (ResponseCache, optional): Response cache consulted before the API.
+        limiter (RateLimiter, optional): Shared rate limiter. Default is the free tier quota.
+        max_workers (int, optional): Number of concurrent downloads.
+        max_retries (int, optional): Retries of a symbol after throttling replies before giving up.
+        backoff (float, optional): Delay in seconds before the first retry, doubled on every further retry.
+        session (requests.Session, optional): Session to use. Default is a new session pooling 'max_workers'
+            connections.
+        datatype (str, optional): Response format, 'json' or 'csv'. Default is 'json'.
+
+    Returns:
+        tuple: A dict of symbol to loaded PriceSource, and a dict of symbol to the exception of failed symbols.
+    """
+
+    if limiter is None:
+        limiter = RateLimiter(*FREE_TIER)
+    own_session = session is None
+    if own_session:
+        session = pooled_session(max_workers)
+
+    def load(symbol):
+        source = PriceSource(symbol, minutes, apikey, cache=cache, session=session, datatype=datatype,
+                             limiter=limiter)
+        source.load()
+        return source
+
+    try:
+        return run_requests(symbols, load, limiter, max_workers, max_retries, backoff)
+    finally:
+        if own_session:
+            session.close()
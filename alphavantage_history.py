@@ -0,0 +1,76 @@
+"""
+alphavantage_history.py defines 'PriceHistory', a local history of intraday bars per (symbol, interval).
+
+The first request for a symbol downloads the full output. Later requests call Price.refresh(), which fetches
+the compact output (latest 100 bars) and merges only the new bars, falling back to a full download when
+the compact window does not reach back to the stored history. With a directory, every history is also kept
+in a .npz file so it survives restarts.
+
+Usage:
+    history = PriceHistory('.alphavantage_history')
+    ticker_symbol = history.get("IBM", 30, apikey)        # full download the first time
+    ticker_symbol = history.get("IBM", 30, apikey)        # compact download merged into the history
+"""
+
+import os
+import threading
+
+from AlphavantagePrice import Price, BarStore
+
+
+class PriceHistory():
+    """Incrementally refreshed bar histories kept in memory and, optionally, on disk."""
+
+    def __init__(self, directory=None, cache=None):
+        """Initialize a PriceHistory.
+
+        Args:
+            directory (str, optional): Directory of the .npz history files. Default is memory only.
+            cache (ResponseCache, optional): Response cache used for the downloads.
+        """
+
+        self.directory = directory
+        self.cache = cache
+        self._prices = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol, minutes, extended_hours):
+        session = 'extended' if extended_hours else 'regular'
+        return os.path.join(self.directory, f'{symbol.upper()}_{minutes}min_{session}.npz')
+
+    def get(self, symbol, minutes, apikey, extended_hours=False, price_class=Price):
+        """Get the up to date bars of a symbol, downloading only what is missing from the history.
+
+        Args:
+            symbol (str): The stock symbol of interest.
+            minutes (int): The time interval in minutes.
+            apikey (str): Your API key for accessing financial data.
+            extended_hours (bool, optional): Whether to include extended hours data. Default is False.
+            price_class (type, optional): Price, PriceExtended or StockDataAnalyzer. Default is Price.
+
+        Returns:
+            Price: An instance of 'price_class' holding the refreshed history.
+        """
+
+        key = (symbol.upper(), minutes, extended_hours)
+        with self._lock:
+            price = self._prices.get(key)
+
+        if price is None and self.directory and os.path.exists(self._path(*key)):
+            bars, metadata = BarStore.load(self._path(*key))
+            price = Price.from_bars(key[0], minutes, bars, metadata or None, apikey, extended_hours, self.cache)
+
+        if price is None:
+            price = Price.from_bars(key[0], minutes, BarStore.empty(), None, apikey, extended_hours, self.cache)
+        price.apikey = apikey
+        price.refresh()
+
+        with self._lock:
+            self._prices[key] = price
+        if self.directory:
+            price.bars.save(self._path(*key), price.get_metadata())
+
+        return price_class.from_bars(key[0], minutes, price.bars, price.get_metadata(), apikey, extended_hours,
+                                     self.cache)
@@ -0,0 +1,252 @@
+"""
+alphavantage_indicators.py computes technical indicators locally from the bars already downloaded,
+instead of one Technical Indicators API request per indicator per symbol.
+
+'IndicatorEngine' wraps a BarStore and computes SMA, EMA, RSI, MACD, Bollinger Bands, ATR and intraday VWAP
+with vectorized NumPy kernels. Results are cached per (indicator, parameters). Every result is aligned with
+the bars (ascending time order) and holds NaN where the indicator is not defined yet.
+
+Usage:
+    engine = ticker_symbol.indicators()
+    rsi = engine.rsi(14)
+    macd, signal, histogram = engine.macd()
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# largest growth factor allowed inside one block of the EMA kernel, keeps the block computation accurate
+_EMA_BLOCK_GROWTH = 1e12
+
+
+def sma(values, period):
+    """Simple moving average over 'period' values.
+
+    Args:
+        values (numpy.ndarray): Input series.
+        period (int): Window length.
+
+    Returns:
+        numpy.ndarray: The moving average, NaN for the first period - 1 values.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if period <= len(values):
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        result[period - 1:] = (sums[period:] - sums[:-period]) / period
+    return result
+
+
+def ema(values, alpha, seed=None):
+    """Exponential moving average y[t] = alpha * x[t] + (1 - alpha) * y[t - 1].
+
+    The recursion is evaluated in blocks in closed form: inside a block y is a cumulative sum of the inputs
+    scaled by powers of (1 - alpha), so each block is a handful of array operations. Blocks are short enough
+    that the powers stay well within float64 precision.
+
+    Args:
+        values (numpy.ndarray): Input series; leading NaN values are skipped.
+        alpha (float): Smoothing factor in (0, 1].
+        seed (float, optional): Value of y before the first input. Default is the first input itself.
+
+    Returns:
+        numpy.ndarray: The average, NaN where the input has not started yet.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return result
+    start = valid[0]
+    x = values[start:]
+    previous = x[0] if seed is None else seed
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        result[start:] = x
+        return result
+    block = max(1, int(np.log(_EMA_BLOCK_GROWTH) / -np.log(decay)))
+    out = result[start:]
+    for first in range(0, len(x), block):
+        chunk = x[first:first + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        out[first:first + len(chunk)] = powers * (previous + np.cumsum(alpha * chunk / powers))
+        previous = out[first + len(chunk) - 1]
+    return result
+
+
+def _wilder(values, period):
+    """Wilder smoothing: seeded with the mean of the first 'period' values, then alpha = 1 / period."""
+
+    result = np.full(len(values), np.nan)
+    if period > len(values):
+        return result
+    seed = values[:period].mean()
+    result[period - 1] = seed
+    result[period:] = ema(values[period:], 1.0 / period, seed=seed)
+    return result
+
+
+class IndicatorEngine():
+    """Technical indicators over a BarStore, computed locally and cached per (indicator, parameters)."""
+
+    def __init__(self, bars):
+        """Initialize an IndicatorEngine.
+
+        Args:
+            bars (BarStore): The bars, in ascending time order.
+        """
+
+        self.bars = bars
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _column(self, column):
+        return getattr(self.bars, column).astype(np.float64, copy=False)
+
+    def sma(self, period=20, column='close'):
+        """Simple moving average of a price column.
+
+        Args:
+            period (int, optional): Window length in bars. Default is 20.
+            column (str, optional): 'open', 'high', 'low' or 'close'. Default is 'close'.
+
+        Returns:
+            numpy.ndarray: The moving average.
+        """
+
+        return self._cached(('sma', period, column), lambda: sma(self._column(column), period))
+
+    def ema(self, period=20, column='close'):
+        """Exponential moving average of a price column, alpha = 2 / (period + 1).
+
+        Args:
+            period (int, optional): Span in bars. Default is 20.
+            column (str, optional): 'open', 'high', 'low' or 'close'. Default is 'close'.
+
+        Returns:
+            numpy.ndarray: The exponential moving average.
+        """
+
+        return self._cached(('ema', period, column), lambda: ema(self._column(column), 2.0 / (period + 1)))
+
+    def rsi(self, period=14):
+        """Relative Strength Index of the closing prices, with Wilder smoothing.
+
+        Args:
+            period (int, optional): Period in bars. Default is 14.
+
+        Returns:
+            numpy.ndarray: RSI between 0 and 100.
+        """
+
+        def compute():
+            changes = np.diff(self.bars.close.astype(np.float64))
+            gains = _wilder(np.maximum(changes, 0.0), period)
+            losses = _wilder(np.maximum(-changes, 0.0), period)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi = 100.0 - 100.0 / (1.0 + gains / losses)
+            rsi[(losses == 0.0) & (gains > 0.0)] = 100.0
+            return np.concatenate(([np.nan], rsi))
+
+        return self._cached(('rsi', period), compute)
+
+    def macd(self, fast=12, slow=26, signal=9):
+        """Moving Average Convergence Divergence of the closing prices.
+
+        Args:
+            fast (int, optional): Span of the fast EMA. Default is 12.
+            slow (int, optional): Span of the slow EMA. Default is 26.
+            signal (int, optional): Span of the signal line EMA. Default is 9.
+
+        Returns:
+            tuple: The MACD line, the signal line and the histogram.
+        """
+
+        def compute():
+            line = self.ema(fast) - self.ema(slow)
+            signal_line = ema(line, 2.0 / (signal + 1))
+            return line, signal_line, line - signal_line
+
+        return self._cached(('macd', fast, slow, signal), compute)
+
+    def bollinger_bands(self, period=20, num_std=2.0):
+        """Bollinger Bands of the closing prices (population standard deviation).
+
+        Args:
+            period (int, optional): Window length in bars. Default is 20.
+            num_std (float, optional): Width of the bands in standard deviations. Default is 2.0.
+
+        Returns:
+            tuple: The middle band (SMA), the upper band and the lower band.
+        """
+
+        def compute():
+            close = self._column('close')
+            middle = self.sma(period)
+            deviation = np.full(len(close), np.nan)
+            if period <= len(close):
+                deviation[period - 1:] = sliding_window_view(close, period).std(axis=1)
+            return middle, middle + num_std * deviation, middle - num_std * deviation
+
+        return self._cached(('bollinger_bands', period, num_std), compute)
+
+    def atr(self, period=14):
+        """Average True Range, with Wilder smoothing.
+
+        Args:
+            period (int, optional): Period in bars. Default is 14.
+
+        Returns:
+            numpy.ndarray: The average true range.
+        """
+
+        def compute():
+            high = self._column('high')
+            low = self._column('low')
+            close = self._column('close')
+            if not len(close):
+                return np.empty(0)
+            previous_close = np.concatenate(([close[0]], close[:-1]))
+            true_range = np.maximum(high, previous_close) - np.minimum(low, previous_close)
+            true_range[0] = high[0] - low[0]
+            return _wilder(true_range, period)
+
+        return self._cached(('atr', period), compute)
+
+    def vwap(self):
+        """Intraday volume weighted average price of the typical price (high + low + close) / 3, reset daily.
+
+        Returns:
+            numpy.ndarray: The running VWAP of each bar's day, NaN until the day has traded volume.
+        """
+
+        def compute():
+            volume = self.bars.volume.astype(np.float64)
+            typical = (self._column('high') + self._column('low') + self._column('close')) / 3.0
+            days = self.bars.timestamps.astype('datetime64[D]')
+            if not len(days):
+                return np.empty(0)
+            new_day = np.concatenate(([True], days[1:] != days[:-1]))
+            starts = np.flatnonzero(new_day)
+            day_index = np.cumsum(new_day) - 1
+
+            def running(values):
+                # cumulative sum restarted at the first bar of each day
+                totals = np.cumsum(values)
+                offsets = np.concatenate(([0.0], totals[starts[1:] - 1]))
+                return totals - offsets[day_index]
+
+            turnover = running(typical * volume)
+            cumulative_volume = running(volume)
+            result = np.full(len(volume), np.nan)
+            np.divide(turnover, cumulative_volume, out=result, where=cumulative_volume > 0)
+            return result
+
+        return self._cached(('vwap',), compute)
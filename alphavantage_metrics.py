@@ -0,0 +1,170 @@
+"""
+alphavantage_metrics.py collects per-stage timers and counters of the AlphavantagePrice hot paths.
+
+The module-level 'metrics' registry is updated by the library: HTTP requests, bytes received, cache hits and
+misses, throttle replies, bars parsed, and the time spent fetching, parsing, analyzing and plotting. Gauges
+hold current levels such as the depth of the request scheduler queue.
+Hooks registered with add_hook() see every update as it happens (e.g. to forward to StatsD or logging), and
+snapshot(), to_json() and to_prometheus() expose the totals.
+
+Usage:
+    from alphavantage_metrics import metrics
+    metrics.add_hook(lambda kind, name, value: print(kind, name, value))
+    ...
+    print(metrics.to_prometheus())
+"""
+
+import contextlib
+import functools
+import json
+import re
+import threading
+import time
+
+
+class Metrics():
+    """Thread-safe registry of counters, gauges and timers."""
+
+    def __init__(self, prefix='alphavantage'):
+        """Initialize a Metrics registry.
+
+        Args:
+            prefix (str, optional): Prefix of the metric names in the Prometheus text format.
+        """
+
+        self.prefix = prefix
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Register a callable called as hook(kind, name, value) on every update.
+
+        'kind' is 'counter' (value is the increment), 'gauge' (value is the new level) or 'timer' (value is the
+        duration in seconds).
+        """
+
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def _notify(self, kind, name, value):
+        for hook in list(self._hooks):
+            hook(kind, name, value)
+
+    def increment(self, name, value=1):
+        """Add 'value' to the counter 'name'."""
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        if self._hooks:
+            self._notify('counter', name, value)
+
+    def gauge(self, name, value):
+        """Set the gauge 'name' to 'value'."""
+
+        with self._lock:
+            self._gauges[name] = value
+        if self._hooks:
+            self._notify('gauge', name, value)
+
+    def observe(self, name, seconds):
+        """Record one duration of the timer 'name'."""
+
+        with self._lock:
+            timer = self._timers.setdefault(name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            timer['count'] += 1
+            timer['total_seconds'] += seconds
+            timer['max_seconds'] = max(timer['max_seconds'], seconds)
+        if self._hooks:
+            self._notify('timer', name, seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Context manager timing its block into the timer 'name'."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def instrument(self, name, counter=None):
+        """Decorator timing every call of a function into the timer 'name', and counting it into 'counter'."""
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if counter:
+                    self.increment(counter)
+                with self.timer(name):
+                    return function(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+    def snapshot(self):
+        """Get a copy of every counter, gauge and timer.
+
+        Returns:
+            dict: {'counters': {name: value}, 'gauges': {name: value},
+                'timers': {name: {'count', 'total_seconds', 'max_seconds'}}}.
+        """
+
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timers': {name: dict(timer) for name, timer in self._timers.items()},
+            }
+
+    def reset(self):
+        """Clear every counter, gauge and timer; hooks stay registered."""
+
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timers.clear()
+
+    def to_json(self):
+        """The snapshot as a JSON string."""
+
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def _metric_name(self, name):
+        return re.sub(r'[^a-zA-Z0-9_]', '_', f'{self.prefix}_{name}')
+
+    def to_prometheus(self):
+        """The snapshot in the Prometheus text exposition format.
+
+        Counters become '<prefix>_<name>_total' and gauges '<prefix>_<name>'; timers become
+        '<prefix>_<name>_seconds' summaries (_count and _sum) plus a '<prefix>_<name>_seconds_max' gauge.
+        """
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = self._metric_name(name) + '_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = self._metric_name(name)
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+        for name, timer in sorted(snapshot['timers'].items()):
+            metric = self._metric_name(name) + '_seconds'
+            lines.append(f'# TYPE {metric} summary')
+            lines.append(f'{metric}_count {timer["count"]}')
+            lines.append(f'{metric}_sum {timer["total_seconds"]:.6f}')
+            lines.append(f'# TYPE {metric}_max gauge')
+            lines.append(f'{metric}_max {timer["max_seconds"]:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+# registry updated by the AlphavantagePrice module
+metrics = Metrics()
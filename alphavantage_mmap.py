@@ -0,0 +1,100 @@
+"""
+alphavantage_mmap.py defines a binary bar file of fixed-width records that is opened with a memory map.
+
+Layout:
+    8 bytes   magic b'AVBARS02'
+    8 bytes   little endian uint64: size of the JSON header
+    n bytes   JSON header ({"symbol", "minutes", "extended_hours", "metadata"}), padded with spaces so the
+              records start on a 64 byte boundary
+    records   'count' records of BAR_DTYPE: timestamp (int64 seconds since the epoch), open, high, low, close
+              (int64 ticks, price * 10**4) and volume (int64), in ascending time order
+
+Opening a file parses only the header; the columns are NumPy views on the mapped records, so nothing is decoded
+or copied and every process mapping the same file shares the page cache.
+
+Usage:
+    ticker_symbol.save_mmap("IBM_30min.bars")
+    ticker_symbol = Price.from_mmap("IBM_30min.bars")
+"""
+
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b'AVBARS02'
+BAR_DTYPE = np.dtype([('timestamp', '<i8'), ('open', '<i8'), ('high', '<i8'), ('low', '<i8'), ('close', '<i8'),
+                      ('volume', '<i8')])
+_ALIGNMENT = 64
+
+
+def write_bar_file(path, bars, header):
+    """Write bars to a bar file atomically.
+
+    Args:
+        path (str): Destination file.
+        bars (BarStore): The bars, in ascending time order.
+        header (dict): JSON serializable header, e.g. symbol, minutes, extended_hours and metadata.
+    """
+
+    records = np.empty(len(bars), dtype=BAR_DTYPE)
+    records['timestamp'] = bars.timestamps.astype('datetime64[s]').astype(np.int64)
+    records['open'] = bars.open_ticks
+    records['high'] = bars.high_ticks
+    records['low'] = bars.low_ticks
+    records['close'] = bars.close_ticks
+    records['volume'] = bars.volume
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix = len(MAGIC) + 8
+    padding = -(prefix + len(header_bytes)) % _ALIGNMENT
+    header_bytes += b' ' * padding
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            f.write(records.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_bar_file(path):
+    """Memory map a bar file.
+
+    Args:
+        path (str): The bar file.
+
+    Returns:
+        tuple: The header dict and a read-only dict of column views: 'timestamps' (datetime64[s]), 'open_ticks',
+            'high_ticks', 'low_ticks', 'close_ticks' (int64 ticks) and 'volume'.
+
+    Raises:
+        ValueError: The file is not a bar file.
+    """
+
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + 8)
+        if len(prefix) < len(MAGIC) + 8 or prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a bar file: {path}")
+        header_size = struct.unpack('<Q', prefix[len(MAGIC):])[0]
+        header = json.loads(f.read(header_size))
+
+    offset = len(MAGIC) + 8 + header_size
+    if os.path.getsize(path) == offset:
+        records = np.empty(0, dtype=BAR_DTYPE)
+    else:
+        records = np.memmap(path, dtype=BAR_DTYPE, mode='r', offset=offset)
+
+    columns = {'timestamps': records['timestamp'].view('datetime64[s]'), 'volume': records['volume']}
+    for name in ('open', 'high', 'low', 'close'):
+        columns[name + '_ticks'] = records[name]
+    return header, columns
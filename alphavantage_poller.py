@@ -0,0 +1,148 @@
+"""
+alphavantage_poller.py streams the new bars of a watch list as they are published.
+
+'BarPoller' keeps one Price per symbol and polls each of them right after every boundary of its interval
+(plus a publication delay). A poll requests the compact output only and merges it into the bars held in
+memory (Price.poll()), so each cycle costs one small request per symbol and yields just the bars that are new
+since the last known bar, or that bar again when the service revised it. The first cycle loads the history
+and yields nothing unless initial=True.
+
+Consumers iterate the poller, with a plain loop in a thread or 'async for' in asyncio code; stop() ends the
+iteration from another thread or task.
+
+Usage:
+    poller = BarPoller.watch(["IBM", "MSFT", "AAPL"], 1, apikey, limiter=RateLimiter(*PREMIUM_75))
+    for symbol, bars in poller:
+        print(symbol, bars.timestamps[-1], bars.close[-1])
+
+    async for symbol, bars in poller:
+        ...
+"""
+
+import asyncio
+import threading
+import time
+
+from AlphavantagePrice import Price
+from alphavantage_fetch import run_requests
+from alphavantage_metrics import metrics
+
+
+class BarPoller():
+    """Interval aligned polling of many Price instances, yielding (symbol, BarStore) of changed bars."""
+
+    def __init__(self, instruments, delay=5.0, limiter=None, max_workers=4, initial=False):
+        """Initialize a BarPoller.
+
+        Args:
+            instruments (list): Price, PriceExtended or StockDataAnalyzer instances, typically lazy.
+            delay (float, optional): Seconds after an interval boundary before polling, giving the service
+                time to publish the bar that just closed. Default is 5.
+            limiter (RateLimiter, optional): Rate limiter acquired before each HTTP request, given to the
+                instruments that have none. Default is no limit.
+            max_workers (int, optional): Number of symbols polled concurrently.
+            initial (bool, optional): Yield the whole history of each symbol on the first cycle.
+                Default is False.
+        """
+
+        self.instruments = list(instruments)
+        self.delay = delay
+        self.limiter = limiter
+        for instrument in self.instruments:
+            if instrument.limiter is None:
+                instrument.limiter = limiter
+        self.max_workers = max_workers
+        self.initial = initial
+        # instrument to the exception of its last failed poll
+        self.errors = {}
+        self._due = {instrument: 0.0 for instrument in self.instruments}
+        self._primed = set()
+        self._stop = threading.Event()
+
+    @classmethod
+    def watch(cls, symbols, minutes, apikey, extended_hours=False, cache=None, **kwargs):
+        """Build a BarPoller of lazy Price instances.
+
+        Args:
+            symbols (list): Stock symbols of interest.
+            minutes (int): The time interval in minutes.
+            apikey (str): Your API key for accessing financial data.
+            extended_hours (bool, optional): Whether to include extended hours bars. Default is False.
+            cache (ResponseCache, optional): Response cache consulted before the API.
+            **kwargs: Arguments of BarPoller, e.g. delay or limiter.
+
+        Returns:
+            BarPoller: The poller; nothing is downloaded before the first cycle.
+        """
+
+        instruments = [Price(symbol, minutes, apikey, extended_hours=extended_hours, cache=cache, lazy=True)
+                       for symbol in symbols]
+        return cls(instruments, **kwargs)
+
+    def _next_boundary(self, instrument, now):
+        interval = int(instrument.interval_mins[:-3]) * 60
+        return (now // interval + 1) * interval + self.delay
+
+    def next_due(self):
+        """Epoch time at which the next instrument is due to be polled."""
+
+        return min(self._due.values()) if self._due else float('inf')
+
+    def poll_once(self, now=None):
+        """Poll the instruments that are due.
+
+        Args:
+            now (float, optional): Current epoch time. Default is time.time().
+
+        Returns:
+            list: (symbol, BarStore) of every instrument with changed bars.
+        """
+
+        now = time.time() if now is None else now
+        due = [instrument for instrument in self.instruments if self._due[instrument] <= now]
+        if not due:
+            return []
+
+        with metrics.timer('poll'):
+            # compact polls skip the cache: a reply cached by the previous cycle would hide the new bar
+            results, errors = run_requests(due, lambda instrument: instrument.poll(fresh=True), self.limiter,
+                                           self.max_workers)
+        for instrument in due:
+            self._due[instrument] = self._next_boundary(instrument, now)
+        self.errors = dict(errors)
+        metrics.increment('poll_errors', len(errors))
+
+        changes = []
+        for instrument in due:
+            bars = results.get(instrument)
+            if bars is None:
+                continue
+            primed = instrument in self._primed
+            self._primed.add(instrument)
+            if len(bars) and (primed or self.initial):
+                metrics.increment('poll_bars', len(bars))
+                changes.append((instrument.symbol, bars))
+        return changes
+
+    def stop(self):
+        """End the iteration at the next wait."""
+
+        self._stop.set()
+
+    def __iter__(self):
+        self._stop.clear()
+        while not self._stop.is_set():
+            for change in self.poll_once():
+                yield change
+            self._stop.wait(max(0.0, self.next_due() - time.time()))
+
+    async def __aiter__(self):
+        self._stop.clear()
+        while not self._stop.is_set():
+            for change in await asyncio.to_thread(self.poll_once):
+                yield change
+            wait = max(0.0, self.next_due() - time.time())
+            # short sleeps so that stop() is noticed without waiting a whole interval
+            while wait > 0 and not self._stop.is_set():
+                await asyncio.sleep(min(wait, 1.0))
+                wait = max(0.0, self.next_due() - time.time())
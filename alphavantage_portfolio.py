@@ -0,0 +1,324 @@
+"""
+alphavantage_portfolio.py defines 'PortfolioAnalyzer', a cross-sectional analyzer of many symbols at once.
+
+The bars of every symbol are aligned onto one common time index (the union of their timestamps) as
+(time x symbol) matrices; a symbol without a bar at some time holds NaN there (zero volume), and prices are
+carried forward over such gaps when returns are computed. Returns, covariance and correlation matrices,
+rolling correlations against a reference, relative volume and the top movers of a day are computed on the
+matrices with NumPy, without a Python loop over symbols or bars.
+
+Usage:
+    sources, errors = fetch_many(symbols, 5, apikey, limiter=RateLimiter(*PREMIUM_75))
+    portfolio = PortfolioAnalyzer.from_sources(sources)
+    movers = portfolio.top_movers(10)                       # [(symbol, daily return), ...]
+    correlation = portfolio.correlation(window=390)         # symbols x symbols
+    relative_volume = portfolio.relative_volume(days=20)    # one ratio per symbol
+"""
+
+import numpy as np
+
+from AlphavantagePrice import BarStore, REGULAR_SESSION_START, REGULAR_SESSION_END, CLOSE_KEY, VOLUME_KEY
+from alphavantage_metrics import metrics
+
+
+def _forward_fill(matrix):
+    """Carry the last valid value of each column forward over NaN rows; leading NaNs stay NaN."""
+
+    rows = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return matrix[rows, np.arange(matrix.shape[1])]
+
+
+def _window_sums(matrix, window):
+    """Sums of 'window' consecutive rows ending at each row; NaN for the first window - 1 rows."""
+
+    sums = np.full(matrix.shape, np.nan)
+    if window <= len(matrix):
+        cumulative = np.cumsum(matrix, axis=0)
+        sums[window - 1] = cumulative[window - 1]
+        sums[window:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+class PortfolioAnalyzer():
+    """Bars of many symbols aligned on a common time index, with vectorized cross-sectional analysis."""
+
+    def __init__(self, bars_by_symbol, extended_hours=True):
+        """Initialize a PortfolioAnalyzer.
+
+        Args:
+            bars_by_symbol (dict): Symbol to its BarStore.
+            extended_hours (bool, optional): Keep extended hours bars; False keeps the regular session only.
+                Default is True.
+        """
+
+        self.symbols = list(bars_by_symbol)
+        self.extended_hours = extended_hours
+        self._bars = []
+        for bars in bars_by_symbol.values():
+            if not extended_hours:
+                bars = bars.select(bars.session_mask(REGULAR_SESSION_START, REGULAR_SESSION_END))
+            self._bars.append(bars)
+
+        if self._bars:
+            self.index = np.unique(np.concatenate([bars.timestamps for bars in self._bars]))
+        else:
+            self.index = BarStore.empty().timestamps
+        # row of each bar of each symbol in the common index
+        self._rows = [np.searchsorted(self.index, bars.timestamps) for bars in self._bars]
+
+        self.close = self.aligned(CLOSE_KEY)
+        self.volume = self.aligned(VOLUME_KEY)
+
+        days = self.index.astype('datetime64[D]')
+        self._day_starts = np.flatnonzero(np.concatenate(([len(days) > 0], days[1:] != days[:-1])))
+        self.dates = days[self._day_starts]
+        self._filled_close = None
+
+    @classmethod
+    def from_instruments(cls, instruments, extended_hours=True):
+        """Build a PortfolioAnalyzer from loaded Price, PriceExtended or StockDataAnalyzer instances."""
+
+        return cls({instrument.symbol: instrument.bars for instrument in instruments}, extended_hours)
+
+    @classmethod
+    def from_sources(cls, sources, extended_hours=True):
+        """Build a PortfolioAnalyzer from a dict of symbol to PriceSource, e.g. the result of fetch_many()."""
+
+        return cls({symbol: source.view(extended_hours)[1] for symbol, source in sources.items()}, extended_hours)
+
+    @classmethod
+    def from_archive(cls, archive, symbols, minutes, start=None, end=None, extended_hours=True):
+        """Build a PortfolioAnalyzer from the partitions of a BarArchive (or BarDatabase) covering [start, end].
+
+        The partitions of the requested session are read, e.g. those of a regular hours backfill when
+        extended_hours is False.
+        """
+
+        return cls({symbol: archive.load_bars(symbol, minutes, start, end, extended_hours) for symbol in symbols},
+                   extended_hours)
+
+    def __len__(self):
+        return len(self.index)
+
+    def aligned(self, parameter):
+        """Align one bar column of every symbol on the common index.
+
+        Args:
+            parameter (str): The column, e.g. '1. open' or '5. volume'.
+
+        Returns:
+            numpy.ndarray: (time x symbol) matrix; NaN (0 for volume) where a symbol has no bar.
+        """
+
+        if parameter == VOLUME_KEY:
+            matrix = np.zeros((len(self.index), len(self.symbols)), dtype=np.int64)
+        else:
+            matrix = np.full((len(self.index), len(self.symbols)), np.nan)
+        for j, (bars, rows) in enumerate(zip(self._bars, self._rows)):
+            matrix[rows, j] = bars.column(parameter)
+        return matrix
+
+    def filled_close(self):
+        """Close matrix with prices carried forward over missing bars (NaN before a symbol's first bar)."""
+
+        if self._filled_close is None:
+            self._filled_close = _forward_fill(self.close)
+        return self._filled_close
+
+    @metrics.instrument('portfolio.returns', 'analyzer_calls')
+    def returns(self, log=False):
+        """Bar to bar returns of every symbol.
+
+        Args:
+            log (bool, optional): Log returns instead of simple returns. Default is False.
+
+        Returns:
+            numpy.ndarray: (time x symbol) matrix; the first row and rows before a symbol's first bar are NaN.
+        """
+
+        close = self.filled_close()
+        returns = np.full(close.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if log:
+                returns[1:] = np.log(close[1:] / close[:-1])
+            else:
+                returns[1:] = close[1:] / close[:-1] - 1.0
+        return returns
+
+    def _window(self, window, log):
+        returns = self.returns(log)
+        return returns if window is None else returns[-window:]
+
+    @metrics.instrument('portfolio.covariance', 'analyzer_calls')
+    def covariance(self, window=None, log=False):
+        """Covariance matrix of the returns, over the bars where both symbols of a pair have a return.
+
+        Args:
+            window (int, optional): Use the last 'window' bars only. Default is every bar.
+            log (bool, optional): Use log returns. Default is False.
+
+        Returns:
+            numpy.ndarray: (symbol x symbol) matrix; NaN for pairs with fewer than two common returns.
+        """
+
+        returns = self._window(window, log)
+        valid = (~np.isnan(returns)).astype(np.float64)
+        values = np.where(np.isnan(returns), 0.0, returns)
+        # pairwise complete sums: count, sum of x over the pair's rows, sum of x * y
+        count = valid.T @ valid
+        sums = values.T @ valid
+        products = values.T @ values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = (products - sums * sums.T / count) / (count - 1)
+        covariance[count < 2] = np.nan
+        return covariance
+
+    @metrics.instrument('portfolio.correlation', 'analyzer_calls')
+    def correlation(self, window=None, log=False):
+        """Correlation matrix of the returns; see covariance()."""
+
+        returns = self._window(window, log)
+        valid = (~np.isnan(returns)).astype(np.float64)
+        values = np.where(np.isnan(returns), 0.0, returns)
+        count = valid.T @ valid
+        sums = values.T @ valid
+        products = values.T @ values
+        squares = (values * values).T @ valid
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = products - sums * sums.T / count
+            variance_x = squares - sums * sums / count
+            correlation = covariance / np.sqrt(variance_x * variance_x.T)
+        correlation[count < 2] = np.nan
+        return correlation
+
+    def _reference_returns(self, returns, against):
+        if against is None:
+            # equal weighted portfolio of the symbols with a return at each bar
+            with np.errstate(invalid='ignore'):
+                counts = np.sum(~np.isnan(returns), axis=1)
+                reference = np.where(counts > 0, np.nansum(returns, axis=1) / np.maximum(counts, 1), np.nan)
+            return reference[:, None]
+        return returns[:, [self.symbols.index(against)]]
+
+    def _rolling_moments(self, window, against, log):
+        returns = self.returns(log)
+        reference = self._reference_returns(returns, against)
+        valid = ~np.isnan(returns) & ~np.isnan(reference)
+        x = np.where(valid, returns, 0.0)
+        y = np.where(valid, reference, 0.0)
+        count = _window_sums(valid.astype(np.float64), window)
+        sum_x, sum_y = _window_sums(x, window), _window_sums(y, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = (_window_sums(x * y, window) - sum_x * sum_y / count) / (count - 1)
+            variance_x = (_window_sums(x * x, window) - sum_x * sum_x / count) / (count - 1)
+            variance_y = (_window_sums(y * y, window) - sum_y * sum_y / count) / (count - 1)
+        covariance[count < 2] = np.nan
+        return covariance, variance_x, variance_y
+
+    @metrics.instrument('portfolio.rolling_covariance', 'analyzer_calls')
+    def rolling_covariance(self, window, against=None, log=False):
+        """Rolling covariance of every symbol's returns with a reference.
+
+        Args:
+            window (int): Number of bars of each window.
+            against (str, optional): Reference symbol. Default is the equal weighted portfolio of the symbols.
+            log (bool, optional): Use log returns. Default is False.
+
+        Returns:
+            numpy.ndarray: (time x symbol) matrix; NaN until a window holds two common returns.
+        """
+
+        return self._rolling_moments(window, against, log)[0]
+
+    @metrics.instrument('portfolio.rolling_correlation', 'analyzer_calls')
+    def rolling_correlation(self, window, against=None, log=False):
+        """Rolling correlation of every symbol's returns with a reference; see rolling_covariance()."""
+
+        covariance, variance_x, variance_y = self._rolling_moments(window, against, log)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return covariance / np.sqrt(variance_x * variance_y)
+
+    def _day(self, date):
+        if not len(self.dates):
+            raise KeyError("No bars")
+        if date is None:
+            return len(self.dates) - 1
+        day = np.searchsorted(self.dates, np.datetime64(date, 'D'))
+        if day == len(self.dates) or self.dates[day] != np.datetime64(date, 'D'):
+            raise KeyError(f"No bars on {date}")
+        return day
+
+    @metrics.instrument('portfolio.daily_returns', 'analyzer_calls')
+    def daily_returns(self):
+        """Close to close return of every symbol for every date, from the last close of the previous date.
+
+        Returns:
+            numpy.ndarray: (date x symbol) matrix aligned with 'dates'; the first date is NaN.
+        """
+
+        close = self.filled_close()
+        day_closes = close[np.append(self._day_starts[1:], len(close)) - 1] if len(close) else close
+        returns = np.full(day_closes.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = day_closes[1:] / day_closes[:-1] - 1.0
+        return returns
+
+    @metrics.instrument('portfolio.top_movers', 'analyzer_calls')
+    def top_movers(self, n=10, date=None, direction='both'):
+        """The symbols that moved most on a date, close to close.
+
+        Args:
+            n (int, optional): Number of symbols. Default is 10.
+            date (str or datetime.date, optional): The date. Default is the latest date.
+            direction (str, optional): 'both' ranks by absolute return, 'up' gainers first, 'down' losers first.
+
+        Returns:
+            list: (symbol, return) tuples, biggest move first; symbols without a return on the date are left out.
+        """
+
+        returns = self.daily_returns()[self._day(date)]
+        if direction == 'up':
+            keys = returns
+        elif direction == 'down':
+            keys = -returns
+        else:
+            keys = np.abs(returns)
+        keys = np.where(np.isnan(keys), -np.inf, keys)
+        n = min(n, int(np.count_nonzero(~np.isnan(returns))))
+        if n <= 0:
+            return []
+        top = np.argpartition(-keys, n - 1)[:n]
+        top = top[np.argsort(-keys[top], kind='stable')]
+        return [(self.symbols[j], float(returns[j])) for j in top]
+
+    @metrics.instrument('portfolio.relative_volume', 'analyzer_calls')
+    def relative_volume(self, days=20, date=None):
+        """Volume of a date relative to the average volume of the preceding dates at the same time of day.
+
+        The volume of the date up to the time of its last bar is compared with the volume of each of the
+        previous 'days' dates up to that same time, so a date still in progress compares fairly.
+
+        Args:
+            days (int, optional): Number of preceding dates averaged. Default is 20.
+            date (str or datetime.date, optional): The date. Default is the latest date.
+
+        Returns:
+            numpy.ndarray: One ratio per symbol, aligned with 'symbols'; NaN without preceding volume.
+        """
+
+        day = self._day(date)
+        day_start = self._day_starts[day]
+        day_end = self._day_starts[day + 1] if day + 1 < len(self._day_starts) else len(self.index)
+        time_of_day = self.index - self.index.astype('datetime64[D]')
+        cutoff = time_of_day[day_end - 1]
+
+        first_day = max(0, day - days)
+        start = self._day_starts[first_day]
+        volume = np.where((time_of_day[start:day_end] <= cutoff)[:, None], self.volume[start:day_end], 0)
+        daily_volume = np.add.reduceat(volume, self._day_starts[first_day:day + 1] - start, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average = daily_volume[:-1].mean(axis=0) if day > first_day else np.full(len(self.symbols), np.nan)
+            ratio = daily_volume[-1] / average
+        ratio[~(average > 0)] = np.nan
+        return ratio
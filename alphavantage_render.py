@@ -0,0 +1,161 @@
+"""
+alphavantage_render.py renders the latest closing price charts of many symbols in parallel, without a display.
+
+'render_charts' extracts the plain chart data (title, dates, prices) of each analyzer in the calling process, so
+that only lists are sent to the worker processes: Price instances hold locks and large columns and are never
+pickled. Each worker draws with the Agg canvas and matplotlib's object API, not pyplot, so no figure is ever
+registered in a global figure manager. A worker builds one figure template (figure, axes, line and labels)
+and reuses it for every chart it renders, replacing only the data, ticks and title; the template is released
+with the worker when the pool shuts down.
+
+Outputs are one PDF and/or PNG file per chart, or a single multi-page PDF. The pages of a multi-page PDF are
+written by the calling process, as PDF pages cannot be merged without another dependency; its template is
+released once the file is closed, as is the one of charts rendered without a pool (max_workers=1).
+
+Usage:
+    results = render_charts(analyzers, output_dir="charts", formats=("pdf", "png"), max_workers=8)
+    render_charts(analyzers, multipage="closing_prices.pdf")
+"""
+
+import concurrent.futures
+import os
+import time
+
+# figure, axes and line reused by every chart rendered in this process
+_template = None
+
+
+def chart_data(analyzer, name=None):
+    """Extract the data of the latest closing prices chart of an analyzer.
+
+    Args:
+        analyzer (StockDataAnalyzer): Loaded analyzer, or any Price with get_latest_closing_prices_by_date().
+        name (str, optional): Output file name without extension. Default is "<SYMBOL>_latest_closing_prices".
+
+    Returns:
+        dict: Picklable 'name', 'title', 'dates' (oldest first) and 'prices' of the chart.
+    """
+
+    closing_prices_by_date = analyzer.get_latest_closing_prices_by_date()
+    symbol = analyzer.get_symbol()
+    return {
+        'name': name or f"{symbol}_latest_closing_prices",
+        'title': f"Latest Closing Prices for {symbol}",
+        'dates': list(closing_prices_by_date)[::-1],
+        'prices': list(closing_prices_by_date.values())[::-1],
+    }
+
+
+def _chart_template():
+    global _template
+    if _template is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        line, = ax.plot([], [], marker='o', linestyle='-')
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Closing Price")
+        _template = (fig, ax, line)
+    return _template
+
+
+def _release_template():
+    global _template
+    _template = None
+
+
+def _draw(chart):
+    """Draw a chart on the template of this process and return its figure."""
+
+    fig, ax, line = _chart_template()
+    positions = list(range(len(chart['dates'])))
+    line.set_data(positions, chart['prices'])
+    ax.set_xticks(positions, chart['dates'], rotation=45)
+    ax.set_title(chart['title'])
+    ax.relim()
+    ax.autoscale_view()
+    fig.tight_layout()
+    return fig
+
+
+def _render(job):
+    """Render one chart to its files; runs in a worker process."""
+
+    chart, output_dir, formats = job
+    started = time.perf_counter()
+    if not chart['dates']:
+        return [], 0.0, None
+    try:
+        fig = _draw(chart)
+        paths = []
+        for file_format in formats:
+            path = os.path.join(output_dir, f"{chart['name']}.{file_format}")
+            fig.savefig(path, format=file_format)
+            paths.append(path)
+    except Exception as e:
+        # reported with the chart instead of failing the other charts of the batch
+        return [], time.perf_counter() - started, f"{type(e).__name__}: {e}"
+    return paths, time.perf_counter() - started, None
+
+
+def _render_multipage(charts, path):
+    """Render every chart as one page of a PDF."""
+
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    results = []
+    with PdfPages(path) as pdf:
+        for chart in charts:
+            started = time.perf_counter()
+            if chart['dates']:
+                pdf.savefig(_draw(chart))
+                results.append(([path], time.perf_counter() - started, None))
+            else:
+                results.append(([], 0.0, None))
+    return results
+
+
+def render_charts(analyzers, output_dir='.', formats=('pdf',), max_workers=None, multipage=None):
+    """Render the latest closing price charts of many analyzers across a process pool.
+
+    Args:
+        analyzers (list): StockDataAnalyzer instances, or chart dicts from chart_data() (e.g. to name the files).
+        output_dir (str, optional): Directory of the files, created if missing. Default is the current directory.
+        formats (tuple, optional): File formats of each chart, e.g. ('pdf', 'png'). Default is PDF only.
+        max_workers (int, optional): Number of worker processes; 1 renders in the calling process.
+            Default is the number of CPUs.
+        multipage (str, optional): Write every chart as a page of this PDF file instead of one file per chart.
+
+    Returns:
+        list: One dict per analyzer, in order: 'name', 'paths' (files written, none for a chart without data),
+            'seconds' (render time) and 'error' (None, or the message of a chart that could not be rendered).
+    """
+
+    charts = [item if isinstance(item, dict) else chart_data(item) for item in analyzers]
+    max_workers = max_workers or os.cpu_count() or 1
+    if multipage:
+        directory = os.path.dirname(multipage)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            rendered = _render_multipage(charts, multipage)
+        finally:
+            _release_template()
+    elif max_workers == 1 or len(charts) <= 1:
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            rendered = [_render((chart, output_dir, tuple(formats))) for chart in charts]
+        finally:
+            _release_template()
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [(chart, output_dir, tuple(formats)) for chart in charts]
+        chunksize = max(1, len(jobs) // (max_workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            rendered = list(executor.map(_render, jobs, chunksize=chunksize))
+
+    return [{'name': chart['name'], 'paths': paths, 'seconds': round(seconds, 6), 'error': error}
+            for chart, (paths, seconds, error) in zip(charts, rendered)]
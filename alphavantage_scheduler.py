@@ -0,0 +1,256 @@
+"""
+alphavantage_scheduler.py defines 'RequestScheduler', a central queue for the API requests of concurrent callers.
+
+Identical requests (same function, symbol, interval, session, output size and month) asked for while one is
+queued or in flight are coalesced: later callers wait for the result of the first one, so the quota is spent
+once. Each caller gets its own future, so a caller that cancels (or an asyncio task that is cancelled) does not
+cancel the others; a queued request whose callers have all cancelled is dropped without being sent.
+Queued requests are served by priority, INTERACTIVE before BATCH (e.g. backfills), first come first served
+within a priority; an interactive caller joining a queued batch request promotes it. Every request that is not
+answered by the cache takes a token from the shared RateLimiter right before it is sent.
+
+The queue depth and in-flight count are published as gauges, and the time each request waited in the queue
+as per-priority timers, of the 'metrics' registry.
+
+Usage:
+    scheduler = RequestScheduler(limiter=RateLimiter(*PREMIUM_75), max_workers=8)
+    Price.default_scheduler = scheduler                  # every download goes through the scheduler
+    ticker_symbol = Price("IBM", 30, apikey)
+    Backfill(archive, apikey, scheduler=scheduler).run(["IBM", "MSFT"], 1, "2022-01", "2023-12")  # BATCH
+"""
+
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+
+from AlphavantagePrice import download_json, download_bars, ThrottleException
+from alphavantage_cache import ResponseCache
+from alphavantage_fetch import pooled_session
+from alphavantage_metrics import metrics
+
+INTERACTIVE = 0
+BATCH = 10
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+
+class _Request():
+    """A queued or running request and the futures of its callers."""
+
+    def __init__(self, key, params, series_key, cache, priority):
+        self.key = key
+        self.params = params
+        self.series_key = series_key
+        self.cache = cache
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.started = False
+        self.futures = []
+
+    def join(self):
+        """Add the future of one more caller; futures joining a running request are claimed right away."""
+
+        future = concurrent.futures.Future()
+        if self.started:
+            future.set_running_or_notify_cancel()
+        self.futures.append(future)
+        return future
+
+    def claim(self):
+        """Mark the futures of the callers as running, dropping those cancelled; True if any caller remains."""
+
+        self.futures = [future for future in self.futures if future.set_running_or_notify_cancel()]
+        return bool(self.futures)
+
+
+class RequestScheduler():
+    """Priority queue of API requests served by a pool of worker threads, with in-flight deduplication."""
+
+    def __init__(self, limiter=None, max_workers=4, session=None):
+        """Initialize a RequestScheduler; worker threads start with the first request.
+
+        Args:
+            limiter (RateLimiter, optional): Rate limiter acquired before each request not served from the cache.
+                Default is no limit.
+            max_workers (int, optional): Number of requests sent concurrently.
+            session (requests.Session, optional): Session to use. Default is a new session pooling
+                'max_workers' connections.
+        """
+
+        self.limiter = limiter
+        self.max_workers = max_workers
+        self.session = session
+        self._own_session = session is None
+        self._queue = []
+        self._order = itertools.count()
+        self._requests = {}
+        self._running = 0
+        self._workers = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _key(self, params, series_key, cache):
+        # a fresh request (cache that only stores) must not join one that may be answered from the cache
+        return ResponseCache.make_key(params) + (series_key, getattr(cache, 'store_only', False))
+
+    def submit(self, params, cache=None, priority=INTERACTIVE, series_key=None):
+        """Queue a request, or join the identical request already queued or in flight.
+
+        Args:
+            params (dict): Query parameters, including the API key.
+            cache (ResponseCache, optional): Response cache consulted before the API and updated after it.
+            priority (int, optional): Lower is served first, e.g. INTERACTIVE or BATCH. Default is INTERACTIVE.
+            series_key (str, optional): Decode the response as it streams in (download_bars) with this time
+                series key. Default is to parse the whole response (download_json).
+
+        Returns:
+            concurrent.futures.Future: Future of this caller, resolving to the parsed response, or to the
+                "Meta Data" dict and BarStore when 'series_key' is given; its result() re-raises download errors.
+                Cancelling it before the request is sent withdraws this caller only.
+        """
+
+        key = self._key(params, series_key, cache)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("RequestScheduler is closed")
+            request = self._requests.get(key)
+            if request is not None:
+                metrics.increment('scheduler_coalesced')
+                if not request.started and priority < request.priority:
+                    # promote: the stale heap entry is skipped when popped
+                    request.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._order), request))
+                return request.join()
+
+            request = _Request(key, params, series_key, cache, priority)
+            self._requests[key] = request
+            heapq.heappush(self._queue, (priority, next(self._order), request))
+            metrics.increment('scheduler_submitted')
+            self._publish_depth()
+            if len(self._workers) < self.max_workers:
+                self._start_worker()
+            future = request.join()
+            self._condition.notify()
+        return future
+
+    def fetch(self, params, cache=None, priority=INTERACTIVE, series_key=None):
+        """Submit a request and wait for its result; see submit()."""
+
+        return self.submit(params, cache, priority, series_key).result()
+
+    async def afetch(self, params, cache=None, priority=INTERACTIVE, series_key=None):
+        """Submit a request and await its result from asyncio code; see submit().
+
+        Cancelling the awaiting task withdraws this caller only; other callers of the request still get it.
+        """
+
+        return await asyncio.wrap_future(self.submit(params, cache, priority, series_key))
+
+    def _start_worker(self):
+        if self._own_session and self.session is None:
+            self.session = pooled_session(self.max_workers)
+        worker = threading.Thread(target=self._work, name=f'alphavantage-scheduler-{len(self._workers)}',
+                                  daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _publish_depth(self):
+        metrics.gauge('scheduler_queue_depth', self.queue_depth())
+        metrics.gauge('scheduler_in_flight', self._running)
+
+    def _next_request(self):
+        """Pop the most urgent request still waiting, or None once closed and drained."""
+
+        with self._condition:
+            while True:
+                while self._queue:
+                    priority, _, request = heapq.heappop(self._queue)
+                    if request.started or priority != request.priority:
+                        continue
+                    request.started = True
+                    if not request.claim():
+                        # every caller cancelled while it was queued
+                        del self._requests[request.key]
+                        metrics.increment('scheduler_cancelled')
+                        self._publish_depth()
+                        continue
+                    self._running += 1
+                    self._publish_depth()
+                    return request
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+    def _work(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            name = PRIORITY_NAMES.get(request.priority, f'priority_{request.priority}')
+            metrics.observe(f'scheduler_wait_{name}', time.monotonic() - request.enqueued_at)
+            try:
+                # the token is taken after the cache lookup, so cached responses cost none
+                if request.series_key is None:
+                    result = download_json(request.params, request.cache, self.session, self.limiter)
+                else:
+                    result = download_bars(request.params, request.series_key, request.cache, self.session,
+                                           self.limiter)
+            except BaseException as e:
+                if isinstance(e, ThrottleException) and self.limiter is not None:
+                    self.limiter.drain()
+                # claimed futures are running and can no longer be cancelled
+                for future in self._finish(request):
+                    future.set_exception(e)
+            else:
+                for future in self._finish(request):
+                    future.set_result(result)
+
+    def _finish(self, request):
+        """Retire a request so that no caller joins it any more, and return the futures of its callers."""
+
+        with self._condition:
+            self._requests.pop(request.key, None)
+            self._running -= 1
+            self._publish_depth()
+            return request.futures
+
+    def queue_depth(self):
+        """Number of requests waiting to be sent."""
+
+        with self._condition:
+            return sum(1 for request in self._requests.values() if not request.started)
+
+    def stats(self):
+        """Current state of the scheduler.
+
+        Returns:
+            dict: 'queue_depth' (waiting requests), 'in_flight' (requests being sent) and 'queued_by_priority'
+                (waiting requests per priority).
+        """
+
+        with self._condition:
+            queued = {}
+            for request in self._requests.values():
+                if not request.started:
+                    queued[request.priority] = queued.get(request.priority, 0) + 1
+            return {'queue_depth': sum(queued.values()), 'in_flight': self._running, 'queued_by_priority': queued}
+
+    def close(self):
+        """Serve the queued requests, then stop the worker threads and close the owned session."""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        if self._own_session and self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,13 +1,36 @@
 """
 alphavantage_service.py is used to exercise methods built-in the AlphavantagePrice module of functions.
 
-Usage: python alphavantage_service.py
+Usage: python alphavantage_service.py [--profile]
+       python alphavantage_service.py --batch --symbols IBM MSFT [--symbols-file FILE] [--intervals 5 30]
+                                      [--workers 8] [--tier premium_75] [--report report.json report.csv]
+
+--profile prints a cProfile summary, the top memory allocations (tracemalloc) and the stage metrics of the run.
+
+--batch runs without any prompt, for scheduled jobs: every (symbol, interval) is downloaded and analyzed
+concurrently, the charts are rendered across a process pool (see alphavantage_render.py), and one report with
+the results and per-stage timings of each symbol is written as JSON or CSV (by file extension). The exit
+status is 1 when any symbol failed.
 """
 
-from AlphavantagePrice import Price, PriceExtended, StockDataAnalyzer, NoDataException
+from AlphavantagePrice import Price, PriceExtended, StockDataAnalyzer, PriceSource, NoDataException
+from alphavantage_metrics import metrics
+from alphavantage_render import chart_data, render_charts
+import argparse
+import cProfile
+import csv
+import datetime
+import json
 import os
+import pstats
 import sys
-import matplotlib.pyplot as plt
+import time
+import tracemalloc
+
+# columns of the batch report, in order
+REPORT_FIELDS = ['symbol', 'interval', 'status', 'error', 'last_refreshed', 'bars', 'open', 'high', 'low', 'close',
+                 'volume', 'days', 'average_closing_price', 'max_volume', 'max_volume_dates', 'pdf',
+                 'fetch_seconds', 'analysis_seconds', 'pdf_seconds', 'total_seconds']
 
 
 def get_api_key():
@@ -50,9 +73,12 @@ def main():
 
     symbol, interval = enter_stock_symbol_command_line()
 
+    # one download feeds the regular hours, extended and analyzer views
+    source = PriceSource(symbol.upper(), interval, retrieved_api_key)
+
     ticker_symbol = None
     try:
-        ticker_symbol = Price(symbol.upper(), interval, retrieved_api_key)
+        ticker_symbol = Price.from_source(source)
     except NoDataException as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -68,7 +94,7 @@ def main():
     print(f'close:          {float(ticker_symbol.close()):.2f}')
     print(f'volume:         {int(ticker_symbol.volume()):,.0f}')
 
-    ticker_symbol = PriceExtended(symbol.upper(), interval, retrieved_api_key)
+    ticker_symbol = PriceExtended.from_source(source)
 
     price_info = ticker_symbol.get_ticker_symbol_info()
     print(f'------------------------------------------------------------------')
@@ -81,7 +107,7 @@ def main():
         else:
             print(f'{key}: {value}')
 
-    ticker_symbol = StockDataAnalyzer(symbol.upper(), interval, retrieved_api_key)
+    ticker_symbol = StockDataAnalyzer.from_source(source)
 
     print(f'------------------------------------------------------------------')
     print('-- Stock Data Analyzer --')
@@ -103,7 +129,253 @@ def main():
         pdf_filename = f"{ticker_symbol.get_symbol()}_latest_closing_prices.pdf"
         fig.savefig(pdf_filename)
         print(f"Plot saved as {pdf_filename}")
+        import matplotlib.pyplot as plt  # already loaded by the plot, deferred to keep startup fast
         plt.show()
+        plt.close(fig)
+
+
+def read_symbols(symbols=None, symbols_file=None):
+    """Collect the symbols of a batch from arguments and/or a file.
+
+    Args:
+        symbols (list, optional): Symbols given on the command line; commas separate several in one argument.
+        symbols_file (str, optional): File of symbols separated by whitespace or commas; '#' starts a comment.
+
+    Returns:
+        list: Upper case symbols without duplicates, in order of appearance.
+    """
+
+    names = []
+    for symbol in symbols or []:
+        names.extend(symbol.split(','))
+    if symbols_file:
+        with open(symbols_file, encoding='utf-8') as f:
+            for line in f:
+                names.extend(line.split('#', 1)[0].replace(',', ' ').split())
+    return list(dict.fromkeys(name.strip().upper() for name in names if name.strip()))
+
+
+def analyze_symbol(symbol, interval, apikey, session=None, cache=None, limiter=None):
+    """Download and analyze one symbol, timing each stage.
+
+    Args:
+        symbol (str): The stock symbol.
+        interval (int): The time interval in minutes.
+        apikey (str): Your API key for accessing financial data.
+        session (requests.Session, optional): Session to use for the download.
+        cache (ResponseCache, optional): Response cache consulted before the API.
+        limiter (RateLimiter, optional): Rate limiter acquired before the HTTP request, not for a cache hit.
+
+    Returns:
+        tuple: One row of the batch report (see REPORT_FIELDS) and the data of its closing price chart
+            (see alphavantage_render.chart_data()).
+    """
+
+    started = time.perf_counter()
+    source = PriceSource(symbol, interval, apikey, cache=cache, session=session, limiter=limiter)
+    source.load()
+    fetched = time.perf_counter()
+
+    ticker_symbol = Price.from_source(source)
+    data_analyzer = StockDataAnalyzer.from_source(source)
+    total_days, avg_closing_price = data_analyzer.average_closing_price()
+    highest_volume_dates, highest_volume = data_analyzer.find_max_volume_dates()
+    row = {
+        'symbol': symbol,
+        'interval': interval,
+        'status': 'ok',
+        'error': None,
+        'last_refreshed': ticker_symbol.get_last_refreshed(),
+        'bars': len(data_analyzer.bars),
+        'open': ticker_symbol.open(),
+        'high': ticker_symbol.high(),
+        'low': ticker_symbol.low(),
+        'close': ticker_symbol.close(),
+        'volume': ticker_symbol.volume(),
+        'days': total_days,
+        'average_closing_price': avg_closing_price,
+        'max_volume': highest_volume,
+        'max_volume_dates': ' '.join(str(date) for date in highest_volume_dates or []),
+        'pdf': None,
+    }
+    finished = time.perf_counter()
+
+    row.update({
+        'fetch_seconds': round(fetched - started, 6),
+        'analysis_seconds': round(finished - fetched, 6),
+        'pdf_seconds': 0.0,
+        'total_seconds': round(finished - started, 6),
+    })
+    chart = chart_data(data_analyzer, f"{symbol}_{interval}min_latest_closing_prices")
+    return row, chart
+
+
+def run_batch(symbols, intervals, apikey, max_workers=4, limiter=None, output_dir='.', pdf=True, cache=None,
+              formats=('pdf',), multipage=None, render_workers=None):
+    """Download and analyze every (symbol, interval) concurrently, then render their charts in parallel.
+
+    Args:
+        symbols (list): Stock symbols of interest.
+        intervals (list): Time intervals in minutes.
+        apikey (str): Your API key for accessing financial data.
+        max_workers (int, optional): Number of symbols downloaded and analyzed concurrently.
+        limiter (RateLimiter, optional): Shared rate limiter. Default is the free tier quota.
+        output_dir (str, optional): Directory of the charts, created if missing.
+        pdf (bool, optional): Whether to render the charts. Default is True.
+        cache (ResponseCache, optional): Response cache consulted before the API.
+        formats (tuple, optional): File formats of each chart, e.g. ('pdf', 'png'). Default is PDF only.
+        multipage (str, optional): Render every chart as a page of this PDF file instead.
+        render_workers (int, optional): Number of rendering processes. Default is the number of CPUs.
+
+    Returns:
+        list: One report row (dict) per (symbol, interval), in the order of the arguments; failed ones have
+            status 'error' and the error message.
+    """
+
+    # imported here to keep the interactive mode free of requests until the first download
+    from alphavantage_fetch import RateLimiter, FREE_TIER, run_requests, pooled_session
+
+    if limiter is None:
+        limiter = RateLimiter(*FREE_TIER)
+
+    def error_row(task, error):
+        return {'symbol': task[0], 'interval': task[1], 'status': 'error', 'error': f"{type(error).__name__}: {error}"}
+
+    def process(task):
+        # a failing symbol is recorded in 'errors' by run_requests, the others go on
+        return analyze_symbol(*task, apikey, session, cache, limiter)
+
+    tasks = [(symbol, interval) for symbol in symbols for interval in intervals]
+    session = pooled_session(max_workers)
+    try:
+        results, errors = run_requests(tasks, process, limiter, max_workers)
+    finally:
+        session.close()
+    rows = [results[task][0] if task in results else error_row(task, errors[task]) for task in tasks]
+
+    charted = [(row, results[task][1]) for row, task in zip(rows, tasks) if task in results and results[task][1]]
+    if pdf and charted:
+        rendered = render_charts([chart for _, chart in charted], output_dir, formats, render_workers, multipage)
+        for (row, _), result in zip(charted, rendered):
+            row['pdf'] = ' '.join(result['paths']) or None
+            row['pdf_seconds'] = result['seconds']
+            row['total_seconds'] = round(row['total_seconds'] + result['seconds'], 6)
+            if result['error']:
+                row['status'], row['error'] = 'error', result['error']
+    return rows
+
+
+def write_report(rows, path, elapsed=None):
+    """Write the rows of a batch to a JSON or CSV report, by file extension.
+
+    Args:
+        rows (list): Report rows from run_batch().
+        path (str): Report file ending in .json or .csv.
+        elapsed (float, optional): Wall clock duration of the batch in seconds, recorded in JSON reports.
+
+    Raises:
+        ValueError: The extension is neither .json nor .csv.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif extension == '.json':
+        report = {
+            'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': elapsed,
+            'succeeded': sum(1 for row in rows if row['status'] == 'ok'),
+            'failed': sum(1 for row in rows if row['status'] != 'ok'),
+            'results': [{field: row.get(field) for field in REPORT_FIELDS} for row in rows],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+    else:
+        raise ValueError(f"Unsupported report format: {path} (use .json or .csv)")
+
+
+def batch_main(argv=None):
+    """Command line entry point of the batch mode.
+
+    Returns:
+        int: Exit status, 1 when a symbol failed.
+    """
+
+    import alphavantage_fetch
+
+    tiers = ['free_tier', 'premium_75', 'premium_150', 'premium_300', 'premium_600', 'premium_1200']
+    parser = argparse.ArgumentParser(description='Download, analyze and plot many symbols without prompts.')
+    parser.add_argument('--batch', action='store_true', help='run in batch mode')
+    parser.add_argument('--profile', action='store_true', help='profile the batch')
+    parser.add_argument('--symbols', nargs='+', default=[], help='symbols, separated by spaces or commas')
+    parser.add_argument('--symbols-file', help='file of symbols, one or more per line')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[30], choices=[1, 5, 15, 30, 60],
+                        help='intervals in minutes')
+    parser.add_argument('--workers', type=int, default=4, help='symbols processed concurrently')
+    parser.add_argument('--tier', choices=tiers, default='free_tier', help='quota of the API key')
+    parser.add_argument('--output-dir', default='.', help='directory of the charts')
+    parser.add_argument('--no-pdf', action='store_true', help='skip the charts')
+    parser.add_argument('--formats', nargs='+', default=['pdf'], choices=['pdf', 'png', 'svg'],
+                        help='file formats of each chart')
+    parser.add_argument('--multipage', help='render every chart as a page of this PDF file instead')
+    parser.add_argument('--render-workers', type=int, default=None, help='chart rendering processes')
+    parser.add_argument('--report', nargs='+', default=['batch_report.json'], help='.json and/or .csv report files')
+    args = parser.parse_args(argv)
+
+    symbols = read_symbols(args.symbols, args.symbols_file)
+    if not symbols:
+        parser.error('no symbols given: use --symbols and/or --symbols-file')
+    for path in args.report:
+        if os.path.splitext(path)[1].lower() not in ('.json', '.csv'):
+            parser.error(f'unsupported report format: {path} (use .json or .csv)')
+
+    limiter = alphavantage_fetch.RateLimiter(*getattr(alphavantage_fetch, args.tier.upper()))
+    started = time.perf_counter()
+    rows = run_batch(symbols, args.intervals, get_api_key(), args.workers, limiter, args.output_dir,
+                     not args.no_pdf, formats=args.formats, multipage=args.multipage,
+                     render_workers=args.render_workers)
+    elapsed = round(time.perf_counter() - started, 6)
+    for path in args.report:
+        write_report(rows, path, elapsed)
+
+    for row in rows:
+        detail = f"{row['total_seconds']:8.2f} s" if row['status'] == 'ok' else row['error']
+        print(f"{row['symbol']:<8} {row['interval']:>3}min {row['status']:<6} {detail}")
+    print(f"{len(rows)} symbols/intervals in {elapsed:.2f} s, report saved as {', '.join(args.report)}")
+    return 1 if any(row['status'] != 'ok' for row in rows) else 0
+
+
+def profile_main(top=25, run=main):
+    """Run main() (or 'run') under cProfile and tracemalloc, then print both summaries and the stage metrics."""
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        return profiler.runcall(run)
+    finally:
+        memory_snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'------------------------------------------------------------------')
+        print('-- Profile (cumulative time) --')
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+        print(f'-- Memory: peak {peak / 1024:,.0f} KiB, top allocations --')
+        for stat in memory_snapshot.statistics('lineno')[:10]:
+            print(stat)
+        print('-- Stage metrics --')
+        print(metrics.to_json())
+
 
 if __name__ == "__main__":
-    main()
+    if '--batch' in sys.argv[1:]:
+        if '--profile' in sys.argv[1:]:
+            sys.exit(profile_main(run=batch_main))
+        sys.exit(batch_main())
+    elif '--profile' in sys.argv[1:]:
+        profile_main()
+    else:
+        main()
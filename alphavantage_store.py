@@ -0,0 +1,249 @@
+"""
+alphavantage_store.py defines 'BarDatabase', an embedded SQLite repository of intraday bars shared by processes.
+
+Bars are rows of one table keyed (and clustered) on (symbol, interval, timestamp), so the bars of any window of a
+symbol are one range scan of the primary key. Prices are stored as int64 ticks, like the BarStore columns, and
+a bar is stored once whatever the session of the download that brought it: regular hours loads filter the
+stored bars. Downloads are upserted in bulk, one transaction per series; a bar downloaded again replaces the
+stored one, as the service revises the last bar of a series.
+
+The database runs in WAL mode: any number of reader processes query it while one writer ingests, readers see
+the last committed transaction and never block the writer. Each thread uses its own connection.
+
+A BarDatabase can stand in for a BarArchive (see alphavantage_backfill): Backfill writes its monthly
+downloads into it, and Price.from_archive() loads windows from it.
+
+Usage:
+    store = BarDatabase('bars.db')
+    store.download(["IBM", "MSFT"], 1, apikey, limiter=RateLimiter(*PREMIUM_75))      # ingest process
+    store.upsert_price(ticker_symbol)                                                  # or any loaded Price
+    data_analyzer = StockDataAnalyzer.from_archive(store, "IBM", 1, "2023-10-02", "2023-10-06 12:00")
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from AlphavantagePrice import BarStore, REGULAR_SESSION_START, REGULAR_SESSION_END, to_datetime64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    open INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    close INTEGER NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (symbol, minutes, timestamp)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    symbol TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    metadata TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (symbol, minutes)
+);
+CREATE TABLE IF NOT EXISTS partitions (
+    symbol TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    extended_hours INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    PRIMARY KEY (symbol, minutes, extended_hours, month)
+);
+"""
+
+
+def _epoch_seconds(timestamp):
+    return int(to_datetime64(timestamp).astype(np.int64))
+
+
+class BarDatabase():
+    """SQLite bar repository indexed on (symbol, interval, timestamp), safe for concurrent processes."""
+
+    def __init__(self, path, timeout=30.0):
+        """Initialize a BarDatabase, creating the database file and its tables if missing.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            timeout (float, optional): Seconds a writer waits for another writer's lock before failing.
+        """
+
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            # WAL: readers and the writer do not block each other; NORMAL sync is durable across app crashes
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def upsert(self, symbol, minutes, bars, metadata=None):
+        """Insert or replace bars of one (symbol, interval) in a single transaction.
+
+        Args:
+            symbol (str): The stock symbol.
+            minutes (int): The time interval in minutes.
+            bars (BarStore): The bars to store.
+            metadata (dict, optional): "Meta Data" of the download, kept with the series.
+
+        Returns:
+            int: Number of bars written.
+        """
+
+        with self._connection() as connection:
+            self._write(connection, symbol.upper(), minutes, bars, metadata)
+        return len(bars)
+
+    def _write(self, connection, symbol, minutes, bars, metadata):
+        timestamps = bars.timestamps.astype('datetime64[s]').astype(np.int64)
+        rows = zip([symbol] * len(bars), [minutes] * len(bars), timestamps.tolist(), bars.open_ticks.tolist(),
+                   bars.high_ticks.tolist(), bars.low_ticks.tolist(), bars.close_ticks.tolist(),
+                   bars.volume.tolist())
+        connection.executemany('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        connection.execute('INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?)',
+                           (symbol, minutes, json.dumps(metadata) if metadata else None, time.time()))
+
+    def upsert_price(self, price):
+        """Store the bars of a loaded Price, PriceExtended or StockDataAnalyzer.
+
+        Returns:
+            int: Number of bars written.
+        """
+
+        return self.upsert(price.symbol, int(price.interval_mins[:-3]), price.bars, price.get_metadata())
+
+    def download(self, symbols, minutes, apikey, **kwargs):
+        """Download the extended hours series of many symbols concurrently and store them.
+
+        Args:
+            symbols (list): Stock symbols of interest.
+            minutes (int): The time interval in minutes.
+            apikey (str): Your API key for accessing financial data.
+            **kwargs: Arguments of fetch_many(), e.g. limiter, max_workers or cache.
+
+        Returns:
+            tuple: A dict of symbol to the number of bars written, and a dict of symbol to the exception of
+                failed symbols.
+        """
+
+        # imported here so that reader processes never import requests
+        from alphavantage_fetch import fetch_many
+
+        sources, errors = fetch_many(symbols, minutes, apikey, **kwargs)
+        written = {}
+        for symbol, source in sources.items():
+            metadata, bars = source.view(True)
+            written[symbol] = self.upsert(symbol, minutes, bars, metadata)
+        return written, errors
+
+    def load_bars(self, symbol, minutes, start=None, end=None, extended_hours=True):
+        """Load the bars within [start, end] with one range scan of the index.
+
+        Args:
+            symbol (str): The stock symbol.
+            minutes (int): The time interval in minutes.
+            start (str or datetime.datetime, optional): First timestamp included. Default is the oldest bar.
+            end (str or datetime.datetime, optional): Last timestamp included. Default is the newest bar.
+            extended_hours (bool, optional): Include the extended hours bars. Default is True.
+
+        Returns:
+            BarStore: The bars of the range in ascending time order.
+        """
+
+        first = _epoch_seconds(start) if start is not None else np.iinfo(np.int64).min
+        last = _epoch_seconds(end) if end is not None else np.iinfo(np.int64).max
+        rows = self._connection().execute(
+            'SELECT timestamp, open, high, low, close, volume FROM bars '
+            'WHERE symbol = ? AND minutes = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp',
+            (symbol.upper(), minutes, int(first), int(last))).fetchall()
+        if not rows:
+            return BarStore.empty()
+
+        columns = np.array(rows, dtype=np.int64).T
+        bars = BarStore.from_ticks(columns[0].astype('datetime64[s]'), *columns[1:])
+        if not extended_hours:
+            bars = bars.select(bars.session_mask(REGULAR_SESSION_START, REGULAR_SESSION_END))
+        return bars
+
+    def metadata(self, symbol, minutes):
+        """The "Meta Data" of the last download stored for a symbol and interval, or None."""
+
+        row = self._connection().execute('SELECT metadata FROM series WHERE symbol = ? AND minutes = ?',
+                                         (symbol.upper(), minutes)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def span(self, symbol, minutes):
+        """Stored range of a symbol and interval.
+
+        Returns:
+            tuple: The first and last timestamps (numpy.datetime64, None if nothing is stored) and the bar count.
+        """
+
+        first, last, count = self._connection().execute(
+            'SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM bars WHERE symbol = ? AND minutes = ?',
+            (symbol.upper(), minutes)).fetchone()
+        if not count:
+            return None, None, 0
+        return np.datetime64(first, 's'), np.datetime64(last, 's'), count
+
+    def symbols(self, minutes=None):
+        """List the stored symbols, of one interval or of any."""
+
+        if minutes is None:
+            rows = self._connection().execute('SELECT DISTINCT symbol FROM series ORDER BY symbol')
+        else:
+            rows = self._connection().execute('SELECT symbol FROM series WHERE minutes = ? ORDER BY symbol',
+                                              (minutes,))
+        return [row[0] for row in rows]
+
+    # BarArchive interface, used by Backfill
+
+    def has_partition(self, symbol, minutes, month, extended_hours=True):
+        """Whether the month of one (symbol, interval) has been written by a backfill."""
+
+        row = self._connection().execute(
+            'SELECT 1 FROM partitions WHERE symbol = ? AND minutes = ? AND extended_hours = ? AND month = ?',
+            (symbol.upper(), minutes, int(extended_hours), month)).fetchone()
+        return row is not None
+
+    def write_partition(self, symbol, minutes, month, bars, metadata=None, extended_hours=True):
+        """Upsert the bars of one month and record the month as written, in one transaction."""
+
+        with self._connection() as connection:
+            self._write(connection, symbol.upper(), minutes, bars, metadata)
+            connection.execute('INSERT OR REPLACE INTO partitions VALUES (?, ?, ?, ?)',
+                               (symbol.upper(), minutes, int(extended_hours), month))
+
+    def months(self, symbol, minutes, extended_hours=True):
+        """List the months written by a backfill for a symbol and interval, ascending."""
+
+        rows = self._connection().execute(
+            'SELECT month FROM partitions WHERE symbol = ? AND minutes = ? AND extended_hours = ? ORDER BY month',
+            (symbol.upper(), minutes, int(extended_hours)))
+        return [row[0] for row in rows]
+
+    def close(self):
+        """Close the connection of the calling thread; it is reopened on the next use."""
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()